@@ -0,0 +1,39 @@
+# acad_eval/ai_models/llm_evaluation/_client.py
+
+"""
+Process-wide google-genai Client.
+
+Every Gemini call (generate, stream, file upload/delete) goes through this one
+client so its pooled HTTP connections are reused instead of each call site
+opening its own transport.
+"""
+
+import functools
+import os
+
+import httpx
+from google import genai
+from google.genai import types
+
+_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+
+def _api_key() -> str:
+    try:
+        from app.core.config import GEMINI_API_KEY
+        return GEMINI_API_KEY
+    except ImportError:
+        return os.environ.get("GEMINI_API_KEY", "")
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> genai.Client:
+    """Returns the shared Client, creating it on first use."""
+    return genai.Client(
+        # None lets the SDK fall back to GOOGLE_API_KEY / GEMINI_API_KEY itself
+        api_key=_api_key() or None,
+        http_options=types.HttpOptions(
+            client_args={"limits": _POOL_LIMITS},
+            async_client_args={"limits": _POOL_LIMITS},
+        ),
+    )
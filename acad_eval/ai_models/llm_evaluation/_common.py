@@ -0,0 +1,151 @@
+# acad_eval/ai_models/llm_evaluation/_common.py
+
+"""
+Pure helpers shared by the grading code: rubric-set hashing, score
+extraction, response text access and file hashing.
+
+Kept free of Gemini imports so callers that only need these helpers do not
+pay the SDK import cost.
+"""
+
+import json
+import re
+import hashlib
+from typing import Dict, Any, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    # stdlib json below is configured to emit the same canonical bytes
+    orjson = None
+
+# ---------------- Precompiled patterns ----------------
+_SCORE_OVER_10 = re.compile(r"(\d+(?:\.\d+)?)\s*/\s*10")
+_ANY_NUM = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+# Single-pass character map used instead of chained str.replace calls
+_DECIMAL_COMMA = str.maketrans({",": "."})
+
+
+# ---------------- Rubric set ID (matches Cell 4) ----------------
+
+def _canonical_json(obj: Any) -> bytes:
+    """Compact, key-sorted UTF-8 JSON; identical bytes with or without orjson."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(text: Any) -> Any:
+    """json.loads, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+# Naive datetimes are taken as UTC; numpy scalars/arrays (e.g. YOLO boxes) are
+# serialized natively instead of raising.
+_ORJSON_OPTS = (orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+def json_dumps(obj: Any) -> str:
+    """Compact JSON text (non-ASCII kept), via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def json_pretty(obj: Any) -> str:
+    """2-space indented JSON text (non-ASCII kept) for files, downloads and console output."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTS | orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=str)
+
+
+def rubrics_prompt_json(parsed_rubrics: List[Dict[str, Any]]) -> str:
+    """The rubric set as embedded in the grading prompt (2-space indented, non-ASCII kept)."""
+    if orjson is not None:
+        return orjson.dumps(parsed_rubrics, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(parsed_rubrics, indent=2, ensure_ascii=False)
+
+
+def compute_rubric_set_id(parsed_rubrics: List[Dict[str, Any]]) -> str:
+    """
+    Stable ID of a rubric set: 128-bit BLAKE2b (32 hex chars) of its compact,
+    key-sorted JSON (`_canonical_json`, via orjson when installed).
+
+    IDs from before this scheme (SHA-256 of `json.dumps`) no longer match, so
+    re-uploading an old rubric creates a new set instead of updating the old one.
+    """
+    return hashlib.blake2b(_canonical_json(parsed_rubrics), digest_size=16).hexdigest()
+
+
+# ---------------- Score extraction helper (Cell 4 logic) ----------------
+
+def extract_numeric_score(text: Any) -> Optional[float]:
+    """Robustly extracts a score out of 10 from the feedback string (Cell 4 logic)."""
+    if not isinstance(text, str):
+        return None
+    s = text.lstrip()
+    # Fast path for the prompted format: "Score: <num>/10 — ..."
+    if s[:7].lower() == "score: ":
+        end = s.find("/10", 7)
+        if end != -1:
+            try:
+                val = float(s[7:end].strip().translate(_DECIMAL_COMMA))
+                if 0 <= val <= 10:
+                    return val
+            except ValueError:
+                pass
+    return _slow_extract_score(text)
+
+
+def _slow_extract_score(text: str) -> Optional[float]:
+    text = text.strip().translate(_DECIMAL_COMMA)
+    # Look for '<num>/10'
+    m = _SCORE_OVER_10.search(text)
+    if m:
+        val = float(m.group(1))
+        return val if 0 <= val <= 10 else None
+
+    # Fallback: any number between 0 and 10
+    m2 = _ANY_NUM.findall(text)
+    for v in m2:
+        val = float(v)
+        if 0 <= val <= 10:
+            return val
+    return None
+
+
+# ---------------- Gemini response text ----------------
+
+_text_warning_shown = False
+
+
+def _gemini_text(resp: Any) -> str:
+    """
+    Text of a Gemini response from either SDK, or "" when it has none
+    (blocked / empty candidate). The first such failure is logged.
+    """
+    global _text_warning_shown
+    try:
+        return resp.text or ""
+    except Exception as e:
+        if not _text_warning_shown:
+            _text_warning_shown = True
+            print(f"⚠️ Gemini response has no text: {e}")
+        return ""
+
+
+# ---------------- File hashing ----------------
+
+def sha256_file(path: str) -> str:
+    """Hex SHA-256 of a file, hashed in chunks instead of reading it into memory."""
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+        return h.hexdigest()
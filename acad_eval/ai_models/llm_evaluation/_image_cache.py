@@ -0,0 +1,87 @@
+# acad_eval/ai_models/llm_evaluation/_image_cache.py
+
+"""
+Cache for bluebook extraction results, keyed by the SHA-256 of the image bytes.
+
+Only identical re-uploads hit. Perceptual-hash matching is deliberately not
+used: bluebook covers share one printed template and differ only in the
+handwritten USN and marks, so a "near-duplicate" may be another student's book.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from ._common import json_dumps, json_loads, sha256_file
+
+# (llm_evaluation -> ai_models -> acad_eval -> project_root)
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+CACHE_PATH = PROJECT_ROOT / "data" / "bluebook_cache.sqlite"
+
+MAX_ENTRIES = 5000
+
+
+def image_sha256(image_path: str) -> str:
+    return sha256_file(image_path)
+
+
+class LRUFileCache:
+    """SQLite-backed image result cache with FIFO eviction past `max_entries`."""
+
+    def __init__(self, path: Path = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS image_cache (
+                    sha256 TEXT PRIMARY KEY,
+                    phash TEXT,  -- no longer written; kept so existing cache files open
+                    value BLOB NOT NULL,
+                    created_at INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Exact lookup by byte hash."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value FROM image_cache WHERE sha256 = ?", (sha256,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Image cache read failed: {e}")
+            return None
+
+        return json_loads(row[0]) if row else None
+
+    def put(self, sha256: str, value: Dict[str, Any]) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO image_cache (sha256, value, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (sha256, json_dumps(value), int(time.time())),
+                )
+                # FIFO eviction: drop the oldest rows beyond max_entries
+                conn.execute(
+                    "DELETE FROM image_cache WHERE sha256 IN ("
+                    "  SELECT sha256 FROM image_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?"
+                    ")",
+                    (self.max_entries,),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Image cache write failed: {e}")
@@ -0,0 +1,86 @@
+# acad_eval/ai_models/llm_evaluation/_llm_cache.py
+
+"""
+Small disk-backed cache for parsed LLM responses.
+
+Entries are stored in a SQLite table and expire after CACHE_TTL_SECONDS.
+Any cache failure is treated as a miss so grading never depends on it.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from ._common import json_dumps, json_loads
+
+# (llm_evaluation -> ai_models -> acad_eval -> project_root)
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+CACHE_PATH = PROJECT_ROOT / "data" / "llm_cache.sqlite"
+CACHE_TTL_SECONDS = 7 * 24 * 3600  # 7 days
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit mode; writes open their own BEGIN IMMEDIATE transaction
+        _conn = sqlite3.connect(str(CACHE_PATH), check_same_thread=False, isolation_level=None)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                created_at INTEGER NOT NULL,
+                expires_at INTEGER NOT NULL
+            )
+            """
+        )
+    return _conn
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """Returns the cached value for `key`, or None on miss / expiry / error."""
+    try:
+        with _lock:
+            row = _connect().execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, int(time.time())),
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache read failed: {e}")
+        return None
+
+    if row is None:
+        return None
+    try:
+        return json_loads(row[0])
+    except ValueError:
+        return None
+
+
+def put(key: str, value: Dict[str, Any], ttl: int = CACHE_TTL_SECONDS) -> None:
+    """Stores `value` under `key` and drops expired entries."""
+    now = int(time.time())
+    payload = json_dumps(value)
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now + ttl),
+                )
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache write failed: {e}")
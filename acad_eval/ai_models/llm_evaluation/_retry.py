@@ -0,0 +1,40 @@
+# acad_eval/ai_models/llm_evaluation/_retry.py
+
+"""
+Exponential-backoff retry for Gemini calls.
+
+Retries rate limits (429) and transient server errors (5xx / deadline) from
+both SDKs in use: google-generativeai (google.api_core exceptions) and
+google-genai (google.genai.errors.APIError).
+"""
+
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
+
+try:
+    from google.genai import errors as genai_errors
+except ImportError:
+    genai_errors = None
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (ResourceExhausted, ServiceUnavailable, DeadlineExceeded, InternalServerError)):
+        return True
+    if genai_errors is not None and isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    return False
+
+
+gemini_retry = retry(
+    wait=wait_exponential_jitter(initial=1, max=60),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
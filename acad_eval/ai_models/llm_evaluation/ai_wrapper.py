@@ -1,13 +1,16 @@
 # ai_models/llm_evaluation/ai_wrapper.py
 
-import google.generativeai as genai
+from google.genai import types
 # 🌟 FIX: Use the modern, stable import path from langchain_core
 from langchain_core.language_models.llms import LLM 
 from pydantic import BaseModel
+from ._client import get_client
+from ._retry import gemini_retry
+from ._common import _gemini_text
 from typing import Optional, List, Mapping, Any
 
 class GeminiLC(LLM, BaseModel):
-    """Tiny LangChain wrapper around google-generativeai for text-only operations."""
+    """Tiny LangChain wrapper around google-genai for text-only operations."""
     model_name: str = "gemini-2.5-flash"
     temperature: float = 0.0
 
@@ -22,12 +25,12 @@ class GeminiLC(LLM, BaseModel):
             "temperature": self.temperature
         }
 
+    @gemini_retry
     def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
         # Note: This simple wrapper only handles text prompts.
-        model = genai.GenerativeModel(self.model_name)
-        resp = model.generate_content(prompt)
-        return (
-            getattr(resp, "text", None)
-            or getattr(resp, "output_text", None)
-            or str(resp)
+        resp = get_client().models.generate_content(
+            model=self.model_name,
+            contents=prompt,
+            config=types.GenerateContentConfig(temperature=self.temperature),
         )
+        return _gemini_text(resp)
@@ -25,12 +25,15 @@ Return format:
 """
 
 from __future__ import annotations
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Union
 from pathlib import Path
 
 # NOTE: project root on sys.path is `acad_eval`,
 # so top-level packages are `ai_models`, `app`, etc.
 from ai_models.yolo_pipeline.pipeline import run_pipeline_and_call_gemini
+from ai_models.llm_evaluation._image_cache import LRUFileCache, image_sha256
 
 # --- Constants ---
 # Get the project root directory (the parent of 'acad_eval')
@@ -38,31 +41,95 @@ PROJECT_ROOT = Path(__file__).resolve().parents[3]
 YOLO_WEIGHTS_PATH = PROJECT_ROOT / "acad_eval" / "ai_models" / "yolo_pipeline" / "weights" / "best.pt"
 OUTPUT_DIR = PROJECT_ROOT / "outputs"
 
+# Results of previous extractions, keyed by the exact image hash
+_result_cache = LRUFileCache()
+
+# Threads used to hash a multi-image upload (file reads and JPEG decodes release the GIL)
+HASH_WORKERS = 8
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_paths() -> None:
+    """
+    Checks the weights and creates the output directory once per process.
+    A missing-weights error is not cached, so it is re-checked on the next call.
+    """
+    if not YOLO_WEIGHTS_PATH.exists():
+        raise FileNotFoundError(f"YOLO weights not found at {YOLO_WEIGHTS_PATH}")
+
+    # Ensure the output directory exists
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+
+def _cache_key(path: str) -> str:
+    """Cache key of one image (SHA-256 of its bytes)."""
+    return image_sha256(path)
+
 
 def extract_bluebook_data(image_paths: Union[str, List[str]]) -> Dict[str, Any]:
     """
     High-level entry point used by the rest of the project.
 
     - Runs the YOLOv8 + Gemini pipeline on one or more images.
+    - Images already seen (byte-identical re-uploads) are
+      served from the local cache and skip the pipeline entirely.
     - Returns the extracted data in the format expected by the application.
     """
-    if not YOLO_WEIGHTS_PATH.exists():
-        raise FileNotFoundError(f"YOLO weights not found at {YOLO_WEIGHTS_PATH}")
+    _ensure_paths()
 
-    # Ensure the output directory exists
-    OUTPUT_DIR.mkdir(exist_ok=True)
+    if isinstance(image_paths, str):
+        image_paths = [image_paths]
+
+    # Split into cache hits and images that still need the pipeline
+    if len(image_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(HASH_WORKERS, len(image_paths))) as executor:
+            keys = dict(zip(image_paths, executor.map(_cache_key, image_paths)))
+    else:
+        keys = {path: _cache_key(path) for path in image_paths}
+
+    cached_bluebooks = {}
+    pending = []
+    for path in image_paths:
+        hit = _result_cache.get(keys[path])
+        if hit is not None:
+            print(f"♻️ Using cached extraction for: {path}")
+            cached_bluebooks[path] = hit.get("bluebooks", [])
+        else:
+            pending.append(path)
+
+    fresh_bluebooks = {}
+    if pending:
+        # Call the new pipeline
+        pipeline_result = run_pipeline_and_call_gemini(
+            image_paths=pending,
+            model_path=str(YOLO_WEIGHTS_PATH),
+            output_project=str(OUTPUT_DIR)
+        )
+
+        if "error" in pipeline_result:
+            return pipeline_result
+
+        # The pipeline already returns data in the desired format.
+        # If the key is "gemini_result", we use that.
+        gemini_result = pipeline_result.get("gemini_result", pipeline_result)
+
+        # Attribute each bluebook back to its source image by its position in `pending`
+        # (basenames are not unique: two uploads can both be IMG_0001.jpg)
+        by_index = {}
+        for b in gemini_result.get("bluebooks", []):
+            b = dict(b)
+            by_index.setdefault(b.pop("_source_index", None), []).append(b)
+        for i, path in enumerate(pending):
+            found = by_index.get(i, [])
+            fresh_bluebooks[path] = found
+            if found:
+                _result_cache.put(keys[path], {"bluebooks": found})
+
+    bluebooks = []
+    for path in image_paths:
+        for bluebook in cached_bluebooks.get(path, fresh_bluebooks.get(path, [])):
+            bluebook = dict(bluebook)
+            bluebook["_source_image"] = Path(path).name
+            bluebooks.append(bluebook)
 
-    # Call the new pipeline
-    pipeline_result = run_pipeline_and_call_gemini(
-        image_paths=image_paths,
-        model_path=str(YOLO_WEIGHTS_PATH),
-        output_project=str(OUTPUT_DIR)
-    )
-
-    # The pipeline already returns data in the desired format.
-    # If the key is "gemini_result", we use that.
-    if "gemini_result" in pipeline_result:
-        return pipeline_result["gemini_result"]
-    
-    # Fallback if the structure is different
-    return pipeline_result
+    return {"bluebooks": bluebooks}
@@ -1,11 +1,113 @@
-import json
-import re
+import asyncio
+import atexit
 import hashlib
-from typing import Dict, Any, List, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
 
-import google.generativeai as genai
+from pydantic import BaseModel
+
+from google.genai import types
 import PyPDF2
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    # PyPDF2 remains the (slower) fallback text extractor
+    pdfium = None
 from .ai_wrapper import GeminiLC
+from ._client import get_client
+from ._retry import gemini_retry, _is_transient
+from . import _llm_cache
+from ._common import (
+    compute_rubric_set_id,
+    extract_numeric_score,
+    json_loads,
+    rubrics_prompt_json,
+    _gemini_text,
+    sha256_file,
+    _WHITESPACE,
+)
+
+# Bump whenever the grading prompt changes so cached results are invalidated.
+PROMPT_VERSION = "v2"
+
+# Max Gemini requests in flight for the batch helpers below.
+GEMINI_CONCURRENCY = int(os.environ.get("EDULENS_GEMINI_CONCURRENCY", "8"))
+
+
+# ---------------- Structured output schemas ----------------
+# With a response schema Gemini returns bare JSON, so no regex clean-up is needed.
+
+class RubricItem(BaseModel):
+    title: str
+    description: str
+    scale: List[str]
+
+
+def _grade_schema(keys: List[str]) -> Dict[str, Any]:
+    """Grading result schema: one string field per requested rubric key."""
+    return {
+        "type": "OBJECT",
+        "properties": {k: {"type": "STRING"} for k in keys},
+        "required": list(keys),
+    }
+
+
+def _json_config(schema: Any, cached_content: Optional[str] = None) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        response_mime_type="application/json", response_schema=schema,
+        cached_content=cached_content,
+    )
+
+
+@gemini_retry
+def _generate_content(model: str, contents: Any,
+                      config: Optional[types.GenerateContentConfig] = None):
+    """generate_content with backoff on rate limits and transient server errors."""
+    return get_client().models.generate_content(model=model, contents=contents, config=config)
+
+
+def _collect_streamed_json(resp: Any, required_keys: List[str]) -> str:
+    """
+    Accumulates streamed text and stops reading as soon as the buffer holds a
+    complete JSON object containing every required key, so the remaining
+    tail of the generation is not waited for.
+    """
+    required = set(required_keys)
+    parts: List[str] = []
+    for chunk in resp:
+        text = _gemini_text(chunk)
+        if not text:
+            # Chunk without text parts (e.g. a finish/safety marker)
+            continue
+        parts.append(text)
+        if "}" not in text:
+            continue
+
+        try:
+            obj = json_loads("".join(parts))
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and required.issubset(obj):
+            break
+    return "".join(parts)
+
+
+@gemini_retry
+def _stream_json(model: str, contents: Any, config: types.GenerateContentConfig,
+                 required_keys: List[str]) -> str:
+    """
+    Streaming variant of `_generate_content` returning the collected JSON text.
+
+    Rate limits and 5xx errors surface while the stream is iterated, so the
+    iteration sits inside the retried call, not just the request.
+    """
+    resp = get_client().models.generate_content_stream(model=model, contents=contents, config=config)
+    return _collect_streamed_json(resp, required_keys)
+
 
 # ---------------- Rubric extraction (match Cell 2) ----------------
 
@@ -27,45 +129,15 @@ Read this rubric document and return a JSON array describing:
 ]
 Do NOT summarize — return full structured data only.
 """
-    response = genai.GenerativeModel("gemini-2.5-flash").generate_content(
-        [prompt, file]
+    response = _generate_content(
+        "gemini-2.5-flash", [prompt, file], _json_config(List[RubricItem])
     )
 
-    raw_rubric_text = (
-        getattr(response, "text", None)
-        or getattr(response, "output_text", None)
-        or str(response)
-    )
-
-    # ---------------------- Robust JSON extraction ----------------------
-
-    # 1. Try to extract content inside ```json ... ``` blocks
-    fenced = re.search(r"```json(.*?)```", raw_rubric_text, re.DOTALL | re.IGNORECASE)
-    if fenced:
-        arr_text = fenced.group(1).strip()
-    else:
-        # 2. Fallback: extract from the FIRST '[' to the LAST ']'
-        start = raw_rubric_text.find("[")
-        end = raw_rubric_text.rfind("]") + 1
-
-        if start != -1 and end != -1 and end > start:
-            arr_text = raw_rubric_text[start:end]
-        else:
-            # 3. Last fallback — raw text (will likely error; debugging)
-            arr_text = raw_rubric_text
-
-    # 4. Normalize quotes
-    arr_text = arr_text.replace("“", '"').replace("”", '"').replace("’", "'")
-
-    # 5. Remove trailing commas inside arrays/objects
-    arr_text = re.sub(r",\s*([}\]])", r"\1", arr_text)
-
-    # 6. Remove fenced block backticks
-    arr_text = arr_text.replace("```", "").strip()
+    arr_text = _gemini_text(response)
 
     # ---------------------- Parse the JSON ----------------------
     try:
-        parsed_rubrics = json.loads(arr_text)
+        parsed_rubrics = json_loads(arr_text)
     except Exception as e:
         raise ValueError(f"Failed to parse rubric JSON: {e}\nPreview:\n{arr_text[:1000]}")
 
@@ -74,59 +146,194 @@ Do NOT summarize — return full structured data only.
         if "key" not in rubric:
             title = (rubric.get("title") or f"criterion_{i+1}").strip()
             key = title.lower()
-            key = re.sub(r"\s+", "_", key)
+            key = _WHITESPACE.sub("_", key)
             key = key.replace("/", "_").replace("-", "_")
             rubric["key"] = key
 
     return parsed_rubrics
 
 
-# ---------------- Rubric set ID (matches Cell 4) ----------------
+# ---------------- Local PDF text (upload fallback) ----------------
 
-def compute_rubric_set_id(parsed_rubrics: List[Dict[str, Any]]) -> str:
-    """Computes a stable hash for the rubric set (same logic as Cell 4)."""
-    rubric_json_canonical = json.dumps(parsed_rubrics, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha256(rubric_json_canonical.encode("utf-8")).hexdigest()
+def _extract_pdf_text(fname: str) -> str:
+    """Extracts the report text locally, preferring pdfium over pure-Python PyPDF2."""
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(fname)
+        try:
+            return "\n".join(page.get_textpage().get_text_range() for page in pdf)
+        finally:
+            pdf.close()
 
+    with open(fname, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return "\n".join(p.extract_text() or "" for p in reader.pages)
 
-# ---------------- Score extraction helper (Cell 4 logic) ----------------
 
-def extract_numeric_score(text: Any) -> Optional[float]:
-    """Robustly extracts a score out of 10 from the feedback string (Cell 4 logic)."""
-    if not isinstance(text, str):
-        return None
-    text = text.strip().replace(",", ".")
-    # Look for '<num>/10'
-    m = re.search(r"(\d+(?:\.\d+)?)\s*/\s*10", text)
-    if m:
-        val = float(m.group(1))
-        return val if 0 <= val <= 10 else None
+# ---------------- Grading cache key ----------------
 
-    # Fallback: any number between 0 and 10
-    m2 = re.findall(r"\b\d+(?:\.\d+)?\b", text)
-    for v in m2:
-        val = float(v)
-        if 0 <= val <= 10:
-            return val
-    return None
+def _grading_cache_key(file_hash: str,
+                       parsed_rubrics: List[Dict[str, Any]],
+                       model_name: str) -> str:
+    """Key for a grading result: prompt version, model, rubric set and report bytes."""
+    raw = PROMPT_VERSION + model_name + compute_rubric_set_id(parsed_rubrics) + file_hash
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
-# ---------------- Grading (match Cell 4 logic) ----------------
+# ---------------- Uploaded file cleanup ----------------
 
-def grade_submission(fname: str,
-                     parsed_rubrics: List[Dict[str, Any]],
-                     model_name: str) -> Dict[str, Any]:
+# Deleting an uploaded report is not on the critical path, so it runs in the
+# background; pending deletes are flushed when the process exits.
+_DELETE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-cleanup")
+atexit.register(_DELETE_EXECUTOR.shutdown, wait=True)
+
+
+def _safe_delete(name: str) -> None:
+    try:
+        get_client().files.delete(name=name)
+    except Exception:
+        pass
+
+
+def _schedule_delete(name: str) -> None:
+    try:
+        _DELETE_EXECUTOR.submit(_safe_delete, name)
+    except RuntimeError:
+        # Executor already shut down (interpreter exiting): delete inline
+        _safe_delete(name)
+
+
+# ---------------- Uploaded report reuse ----------------
+
+# Gemini keeps uploaded files for 48 h; stop reusing a handle an hour before that.
+UPLOAD_TTL_SECONDS = 47 * 3600
+
+_upload_lock = threading.Lock()
+_uploads: Dict[str, Tuple[Any, float]] = {}  # report sha256 -> (file handle, uploaded_at)
+
+
+def _is_active(file_obj: Any) -> bool:
+    try:
+        return get_client().files.get(name=file_obj.name).state == types.FileState.ACTIVE
+    except Exception:
+        return False
+
+
+def _get_or_upload(fname: str, file_hash: str) -> Any:
     """
-    Calls Gemini to grade the submitted report and parses the result.
+    Returns an uploaded handle for the report, reusing an earlier upload of the
+    same bytes (e.g. re-grading after a rubric edit) while it is still live.
+    """
+    with _upload_lock:
+        entry = _uploads.get(file_hash)
 
-    This is aligned with Colab Cell 4:
-    - Same grading prompt
-    - Upload PDF to Gemini, fallback to local PDF text extraction
-    - Parse JSON object from model output
-    - Compute total_score by matching rubric key OR title (plus fuzzy match)
+    if entry is not None:
+        file_obj, uploaded_at = entry
+        if time.time() - uploaded_at < UPLOAD_TTL_SECONDS and _is_active(file_obj):
+            return file_obj
+        with _upload_lock:
+            if _uploads.get(file_hash) is entry:
+                del _uploads[file_hash]
+        _schedule_delete(file_obj.name)
+
+    file_obj = get_client().files.upload(file=fname)
+    with _upload_lock:
+        replaced = _uploads.get(file_hash)
+        _uploads[file_hash] = (file_obj, time.time())
+    if replaced is not None:
+        _schedule_delete(replaced[0].name)
+    return file_obj
+
+
+def _delete_cached_uploads() -> None:
+    with _upload_lock:
+        names = [file_obj.name for file_obj, _ in _uploads.values()]
+        _uploads.clear()
+    for name in names:
+        _schedule_delete(name)
+
+
+# atexit runs handlers in reverse order, so this queues its deletes before the
+# cleanup executor is shut down (and flushed).
+atexit.register(_delete_cached_uploads)
+
+
+# ---------------- Grading prompt context cache ----------------
+
+# The grading instruction (rubric JSON + task) is identical for every report
+# graded against a rubric set, so it is stored once as Gemini cached content
+# and each request only sends the report.
+PROMPT_CACHE_TTL_SECONDS = 3600
+# Refresh a cache this long before it expires rather than racing its expiry
+PROMPT_CACHE_REFRESH_MARGIN = 300
+
+_prompt_cache_lock = threading.Lock()
+# sha256(model + instruction) -> (cached content name or None, expires_at)
+_prompt_caches: Dict[str, Tuple[Optional[str], float]] = {}
+
+
+@gemini_retry
+def _create_instruction_cache(model_name: str, instruction: str) -> str:
+    """caches.create with backoff on rate limits and transient server errors."""
+    return get_client().caches.create(
+        model=model_name,
+        config=types.CreateCachedContentConfig(
+            contents=[instruction], ttl=f"{PROMPT_CACHE_TTL_SECONDS}s"
+        ),
+    ).name
+
+
+def _below_cache_minimum(exc: BaseException) -> bool:
+    """Whether caches.create refused the content for being under the model's minimum token count."""
+    msg = str(exc).lower()
+    return getattr(exc, "code", None) == 400 and ("min_total_token_count" in msg or "too small" in msg)
+
+
+def _cached_instruction(model_name: str, instruction: str) -> Optional[str]:
+    """
+    Name of a cached content holding `instruction`, or None when it cannot be
+    cached (e.g. below the model's minimum token count for explicit caching;
+    Gemini's implicit prefix caching still applies then).
     """
+    key = hashlib.sha256((model_name + instruction).encode("utf-8")).hexdigest()
+    now = time.time()
+    with _prompt_cache_lock:
+        entry = _prompt_caches.get(key)
+    if entry is not None and now < entry[1] - PROMPT_CACHE_REFRESH_MARGIN:
+        return entry[0]
+
+    name = None
+    if entry is not None and entry[0] and now < entry[1]:
+        # Still alive: extend it instead of creating a second copy
+        try:
+            get_client().caches.update(
+                name=entry[0],
+                config=types.UpdateCachedContentConfig(ttl=f"{PROMPT_CACHE_TTL_SECONDS}s"),
+            )
+            name = entry[0]
+        except Exception:
+            name = None
+    if name is None:
+        try:
+            name = _create_instruction_cache(model_name, instruction)
+        except Exception as e:
+            if not _below_cache_minimum(e):
+                # Transient or unexpected: send the instruction inline this time, try again next report
+                print(f"⚠️ Could not cache the grading instruction ({e}); sending it inline.")
+                return None
+            name = None  # too small to cache; remembered so it is not retried per report
+
+    with _prompt_cache_lock:
+        _prompt_caches[key] = (name, now + PROMPT_CACHE_TTL_SECONDS)
+    return name
+
+
+# ---------------- Grading (match Cell 4 logic) ----------------
+
+def _grading_prompt(parsed_rubrics: List[Dict[str, Any]],
+                    rubrics_json: Optional[str] = None) -> Tuple[str, List[str]]:
+    """Grading instruction (Cell 4 prompt) and the result keys it asks for."""
     expected_keys = [r["key"] for r in parsed_rubrics if "key" in r]
-    rubrics_json_for_prompt = json.dumps(parsed_rubrics, indent=2, ensure_ascii=False)
+    rubrics_json_for_prompt = rubrics_json or rubrics_prompt_json(parsed_rubrics)
     requested_keys_list = expected_keys + ["overall_summary"]
     requested_keys = ", ".join([f'"{k}"' for k in requested_keys_list])
 
@@ -143,102 +350,267 @@ Task:
 - Return ONLY a JSON object with keys: {requested_keys}
 """
 
-    model = genai.GenerativeModel(model_name)
+    return grader_instruction, requested_keys_list
+
+
+def _add_total_score(parsed_result: Dict[str, Any], parsed_rubrics: List[Dict[str, Any]]) -> None:
+    """Sets parsed_result["total_score"] from the per-rubric score strings."""
+    # Compute total score like Cell 4:
+    #   - match by key
+    #   - if not found, try title
+    #   - if still not found, fuzzy substring match on keys
+    # Returned keys are normalized once so exact matches are dict lookups.
+    normalized = {
+        k.strip().lower(): v for k, v in parsed_result.items() if isinstance(k, str)
+    }
+    normalized_items = list(normalized.items())
+    numeric_scores: List[float] = []
+
+    for r in parsed_rubrics:
+        title = (r.get("title") or "").strip().lower()
+        key = (r.get("key") or "").strip().lower()
+
+        # Exact match on key or title
+        if key in normalized or title in normalized:
+            value = normalized[key] if key in normalized else normalized[title]
+            s = extract_numeric_score(value)
+            if s is not None:
+                numeric_scores.append(s)
+            continue
+
+        # Fuzzy substring match on returned keys if not found
+        for rk, returned_v in normalized_items:
+            if title in rk or key in rk:
+                s = extract_numeric_score(returned_v)
+                if s is not None:
+                    numeric_scores.append(s)
+                    break
+
+    total = round(sum(numeric_scores), 2)
+    parsed_result["total_score"] = total
+
+
+def grade_submission(fname: str,
+                     parsed_rubrics: List[Dict[str, Any]],
+                     model_name: str,
+                     rubrics_json: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Calls Gemini to grade the submitted report and parses the result.
+
+    This is aligned with Colab Cell 4:
+    - Same grading prompt
+    - Upload PDF to Gemini, fallback to local PDF text extraction
+    - Stream the model output and stop once the JSON object is complete
+    - Request JSON output constrained to the rubric keys and parse it directly
+    - Compute total_score by matching rubric key OR title (plus fuzzy match)
+
+    Results are cached on disk, so re-grading the same report against the
+    same rubric set and model returns the stored result without calling Gemini.
+
+    `rubrics_json` is the pre-serialized prompt form of `parsed_rubrics`
+    (see `rubrics_prompt_json`), for callers that grade many reports against
+    one rubric set.
+    """
+    file_hash = sha256_file(fname)
+    cache_key = _grading_cache_key(file_hash, parsed_rubrics, model_name)
+    cached = _llm_cache.get(cache_key)
+    if cached is not None:
+        print("♻️ Using cached grading result.")
+        return cached
+
+    grader_instruction, requested_keys_list = _grading_prompt(parsed_rubrics, rubrics_json)
+
+    json_config = _json_config(_grade_schema(requested_keys_list))
     raw_out = ""
-    file_obj = None
 
-    # Try direct file upload (Cell 4 style)
+    # Try direct file upload (Cell 4 style); the handle is kept for re-grades.
+    # With a cached instruction only the report is sent.
     try:
-        if GEMINI_CLIENT is None:
-            # Try to initialize late if needed (shouldn't happen if main.py runs first)
-            GEMINI_CLIENT = genai.Client()
-
-        file_obj = GEMINI_CLIENT.files.upload(file=fname)
-        resp = model.generate_content([grader_instruction, file_obj])
-        raw_out = (
-            getattr(resp, "text", None)
-            or getattr(resp, "output_text", None)
-            or str(resp)
-        )
+        file_obj = _get_or_upload(fname, file_hash)
+        cached_name = _cached_instruction(model_name, grader_instruction)
+        if cached_name:
+            raw_out = _stream_json(
+                model_name, [file_obj], _json_config(_grade_schema(requested_keys_list), cached_name),
+                requested_keys_list,
+            )
+        else:
+            raw_out = _stream_json(model_name, [grader_instruction, file_obj], json_config,
+                                   requested_keys_list)
     except Exception as e:
+        if _is_transient(e):
+            # Retries exhausted on a rate limit / server error: not an upload problem
+            raise
         print(f"⚠️ Upload to Gemini failed ({e}), attempting local PDF extraction...")
         # Fallback to local PDF text extraction
-        txt = ""
         try:
-            with open(fname, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                txt = "\n".join(p.extract_text() or "" for p in reader.pages)
+            txt = _extract_pdf_text(fname)
         except Exception:
             txt = ""
         if not txt:
             raise SystemExit("❌ Could not upload or extract text from the PDF.")
-        resp = model.generate_content(grader_instruction + "\n\nProject Report:\n" + txt)
-        raw_out = (
-            getattr(resp, "text", None)
-            or getattr(resp, "output_text", None)
-            or str(resp)
-        )
-    finally:
-        # Clean up uploaded file if we created one
-        if file_obj is not None:
-            try:
-                genai.delete_file(file_obj.name)
-            except Exception:
-                pass
+        raw_out = _stream_json(model_name, grader_instruction + "\n\nProject Report:\n" + txt,
+                               json_config, requested_keys_list)
 
-    # Parse JSON from Gemini output (Cell 4 pattern)
-    m = re.search(r"\{.*\}", raw_out, re.DOTALL)
-    if not m:
+    # JSON mode: the output is the bare object
+    try:
+        parsed_result = json_loads(raw_out)
+    except ValueError:
         raise ValueError(
             f"Model did not return valid JSON. Raw output (preview):\n{raw_out[:1000]}"
         )
 
-    json_text = m.group(0)
-    json_text = re.sub(r'[“”’]', '"', json_text)
-    json_text = re.sub(r',\s*([}\]])', r'\1', json_text)  # remove trailing commas
+    _add_total_score(parsed_result, parsed_rubrics)
+    _llm_cache.put(cache_key, parsed_result)
+    return parsed_result
 
-    parsed_result = json.loads(json_text)
+# ---------------- Batch grading ----------------
 
-    # Compute total score like Cell 4:
-    #   - match by key
-    #   - if not found, try title
-    #   - if still not found, fuzzy substring match on keys
-    numeric_scores: List[float] = []
+async def _grade_one(sem: asyncio.Semaphore,
+                     fname: str,
+                     parsed_rubrics: List[Dict[str, Any]],
+                     model_name: str) -> Dict[str, Any]:
+    async with sem:
+        return await asyncio.to_thread(grade_submission, fname, parsed_rubrics, model_name)
 
-    for r in parsed_rubrics:
-        title = (r.get("title") or "").strip()
-        key = (r.get("key") or "").strip()
-        found = False
 
-        # Exact match on key or title
-        for returned_k, returned_v in parsed_result.items():
-            if not isinstance(returned_k, str):
-                continue
-            rk = returned_k.strip().lower()
-            if rk == key.lower() or rk == title.lower():
-                s = extract_numeric_score(returned_v)
-                if s is not None:
-                    numeric_scores.append(s)
-                found = True
-                break
+async def grade_submissions_async(fnames: List[str],
+                                  parsed_rubrics: List[Dict[str, Any]],
+                                  model_name: str,
+                                  concurrency: int = GEMINI_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Grades several reports against the same rubric set concurrently.
 
-        # Fuzzy substring match on returned keys if not found
-        if not found:
-            for returned_k, returned_v in parsed_result.items():
-                if not isinstance(returned_k, str):
-                    continue
-                rk = returned_k.strip().lower()
-                if title.lower() in rk or key.lower() in rk:
-                    s = extract_numeric_score(returned_v)
-                    if s is not None:
-                        numeric_scores.append(s)
-                        found = True
-                        break
+    At most `concurrency` Gemini requests are in flight at once; results are
+    returned in the same order as `fnames`.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *[_grade_one(sem, f, parsed_rubrics, model_name) for f in fnames]
+    )
 
-    total = round(sum(numeric_scores), 2)
-    parsed_result["total_score"] = total
 
-    return parsed_result
+def grade_many(fnames: List[str],
+               parsed_rubrics: List[Dict[str, Any]],
+               model_name: str,
+               max_workers: int = GEMINI_CONCURRENCY) -> Dict[str, Dict[str, Any]]:
+    """
+    Thread-pool variant of grade_submissions_async for synchronous callers.
+
+    Returns {fname: result}. A failed report maps to {"error": "..."} so one
+    bad PDF does not discard the rest of the batch.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futs = {ex.submit(grade_submission, f, parsed_rubrics, model_name): f for f in fnames}
+        for fut in as_completed(futs):
+            try:
+                results[futs[fut]] = fut.result()
+            except (Exception, SystemExit) as e:  # SystemExit: unreadable PDF
+                results[futs[fut]] = {"error": str(e)}
+    return results
+
+
+# ---------------- Gemini Batch API ----------------
+
+# Batch jobs run at half the per-token price but may take up to 24 h, so they
+# suit offline regrades rather than interactive submissions.
+BATCH_POLL_SECONDS = 30
+BATCH_TIMEOUT_SECONDS = 24 * 3600
+
+_BATCH_DONE_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED,
+    types.JobState.JOB_STATE_CANCELLED,
+    types.JobState.JOB_STATE_EXPIRED,
+}
+
+
+def grade_batch(fnames: List[str],
+                parsed_rubrics: List[Dict[str, Any]],
+                model_name: str,
+                rubrics_json: Optional[str] = None,
+                poll_seconds: float = BATCH_POLL_SECONDS,
+                timeout_seconds: float = BATCH_TIMEOUT_SECONDS) -> Dict[str, Dict[str, Any]]:
+    """
+    Grades many reports against one rubric set as a single Gemini batch job
+    and blocks until it finishes.
+
+    Reports already in the grading cache are not sent. Returns {fname: result}
+    like grade_many; a report that could not be graded maps to {"error": "..."}.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    pending: List[Tuple[str, str, str]] = []  # (fname, file_hash, cache_key)
+    for fname in dict.fromkeys(fnames):
+        try:
+            file_hash = sha256_file(fname)
+        except OSError as e:
+            results[fname] = {"error": str(e)}
+            continue
+        cache_key = _grading_cache_key(file_hash, parsed_rubrics, model_name)
+        cached = _llm_cache.get(cache_key)
+        if cached is not None:
+            results[fname] = cached
+        else:
+            pending.append((fname, file_hash, cache_key))
+    if not pending:
+        return results
+
+    grader_instruction, requested_keys_list = _grading_prompt(parsed_rubrics, rubrics_json)
+    json_config = _json_config(_grade_schema(requested_keys_list))
+
+    requests, sent = [], []
+    for fname, file_hash, cache_key in pending:
+        try:
+            file_obj = _get_or_upload(fname, file_hash)
+        except Exception as e:
+            results[fname] = {"error": f"Upload failed: {e}"}
+            continue
+        requests.append(types.InlinedRequest(contents=[grader_instruction, file_obj], config=json_config))
+        sent.append((fname, cache_key))
+    if not requests:
+        return results
+
+    client = get_client()
+    job = client.batches.create(model=model_name, src=requests)
+    print(f"📦 Submitted batch job {job.name} with {len(requests)} reports.")
+    deadline = time.monotonic() + timeout_seconds
+    while job.state not in _BATCH_DONE_STATES:
+        if time.monotonic() > deadline:
+            for fname, _ in sent:
+                results[fname] = {"error": f"Batch job {job.name} timed out"}
+            return results
+        time.sleep(poll_seconds)
+        job = client.batches.get(name=job.name)
+
+    responses = (job.dest.inlined_responses if job.dest else None) or []
+    if job.state != types.JobState.JOB_STATE_SUCCEEDED or len(responses) != len(sent):
+        reason = job.error.message if job.error else job.state
+        for fname, _ in sent:
+            results[fname] = {"error": f"Batch job failed: {reason}"}
+        return results
+
+    for (fname, cache_key), item in zip(sent, responses):
+        if item.error is not None:
+            results[fname] = {"error": item.error.message or "Gemini returned an error"}
+            continue
+        raw_out = _gemini_text(item.response)
+        try:
+            parsed_result = json_loads(raw_out)
+        except ValueError:
+            results[fname] = {"error": f"Model did not return valid JSON. Raw output (preview):\n{raw_out[:1000]}"}
+            continue
+        _add_total_score(parsed_result, parsed_rubrics)
+        _llm_cache.put(cache_key, parsed_result)
+        results[fname] = parsed_result
+    return results
+
+
+def validate_many(rubric_sets: List[List[Dict[str, Any]]],
+                  max_workers: int = GEMINI_CONCURRENCY) -> List[Dict[str, Any]]:
+    """Runs validate_rubrics_with_llm over several rubric sets concurrently, in input order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(validate_rubrics_with_llm, rubric_sets))
+
 
 def validate_rubrics_with_llm(parsed_rubrics: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -248,7 +620,7 @@ def validate_rubrics_with_llm(parsed_rubrics: List[Dict[str, Any]]) -> Dict[str,
     # Initialize the wrapper
     llm = GeminiLC(temperature=0.2)
     
-    rubric_text = json.dumps(parsed_rubrics, indent=2)
+    rubric_text = rubrics_prompt_json(parsed_rubrics)
     
     prompt = f"""
     You are a Quality Assurance Auditor for academic rubrics.
@@ -275,6 +647,6 @@ def validate_rubrics_with_llm(parsed_rubrics: List[Dict[str, Any]]) -> Dict[str,
     # Basic parsing (strip markdown)
     clean_str = response_str.replace("```json", "").replace("```", "").strip()
     try:
-        return json.loads(clean_str)
+        return json_loads(clean_str)
     except:
         return {"is_valid": True, "warnings": ["Could not parse validation response"], "suggestion": "Proceed with caution."}
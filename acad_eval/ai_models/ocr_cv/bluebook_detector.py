@@ -2,39 +2,104 @@
 
 import os
 from typing import List, Tuple
+
 from PIL import Image
+import torch
 from ultralytics import YOLO
 
+Box = Tuple[int, int, int, int]  # (x1, y1, x2, y2) in page pixels
+
+PREDICT_IMGSZ = 1024
+# JPEGs are decoded at the nearest 1/2, 1/4 or 1/8 scale not below this size
+DECODE_MAX_SIZE = (1600, 1600)
+
+
+def load_page(image_path: str) -> Image.Image:
+    """Opens a page as RGB, letting libjpeg downscale during decode when possible."""
+    img = Image.open(image_path)
+    img.draft("RGB", DECODE_MAX_SIZE)  # no-op for non-JPEG formats
+    return img.convert("RGB")
+
 
 class BluebookDetector:
-    """YOLO detector. If weights not found -> fallback to full image."""
+    """
+    YOLO detector. If weights not found -> fallback to full image.
+
+    Nothing in the tree instantiates this class yet, so its FP16, torch.compile,
+    warm-up and draft-decode speedups don't reach the live pipeline
+    (ai_models/yolo_pipeline/pipeline.py).
+    """
 
     def __init__(self):
         here = os.path.dirname(__file__)
         self.weights = os.path.join(here, "weights", "bluebook_yolo.pt")
 
+        # FP16 only pays off (and is only supported) on CUDA
+        self.half = torch.cuda.is_available()
+
         if os.path.exists(self.weights):
             self.yolo = YOLO(self.weights)
+            if self.half:
+                self.yolo.model.half()
+                self._compile()
+            self._warm_up()
         else:
             self.yolo = None  # fallback mode
 
-    def crop_bluebooks(self, image_path: str) -> List[Tuple[Image.Image, List[float]]]:
-        img = Image.open(image_path).convert("RGB")
-        W, H = img.size
+    def _compile(self):
+        """Compiles the network graph; any failure keeps the eager model."""
+        if not hasattr(torch, "compile"):
+            return
+        eager = self.yolo.model
+        try:
+            self.yolo.model = torch.compile(eager, mode="reduce-overhead")
+            self._warm_up()
+        except Exception as e:
+            print(f"⚠️ torch.compile unavailable for YOLO, using eager model: {e}")
+            self.yolo.model = eager
+
+    def _warm_up(self):
+        """One dummy inference so the first real page doesn't pay setup cost."""
+        blank = Image.new("RGB", (PREDICT_IMGSZ, PREDICT_IMGSZ))
+        self._predict([blank])
+
+    def _predict(self, images: List[Image.Image]):
+        return self.yolo.predict(
+            images, conf=0.4, iou=0.5, verbose=False, half=self.half, imgsz=PREDICT_IMGSZ
+        )
+
+    @staticmethod
+    def _boxes_from_result(result, img: Image.Image) -> List[Box]:
+        # Cast on-device and copy once, instead of a float numpy round trip per box
+        xyxy = result.boxes.xyxy.to(torch.int32).cpu().tolist() if result is not None else []
+        if not xyxy:
+            return [(0, 0, *img.size)]
+        return [tuple(box) for box in xyxy]
+
+    def detect_bluebooks(self, image_path: str) -> Tuple[Image.Image, List[Box]]:
+        """
+        Returns the full page and the bluebook boxes on it, without cropping,
+        so the whole page can go to the vision model in one request.
+        """
+        return self.detect_many([image_path])[0]
+
+    def detect_many(self, image_paths: List[str]) -> List[Tuple[Image.Image, List[Box]]]:
+        """Batch form of detect_bluebooks: all pages go through YOLO in one predict call."""
+        imgs = [load_page(p) for p in image_paths]
 
         # NO YOLO → fallback
         if self.yolo is None:
-            return [(img, [0, 0, W, H])]
-
-        # YOLO DETECTION
-        results = self.yolo.predict(image_path, conf=0.4, iou=0.5, verbose=False)
-        boxes = results[0].boxes.xyxy.cpu().numpy() if results else []
+            return [(img, [(0, 0, *img.size)]) for img in imgs]
 
-        if len(boxes) == 0:
-            return [(img, [0, 0, W, H])]
+        # YOLO DETECTION on the already-decoded images (no second read from disk)
+        results = self._predict(imgs) if imgs else []
+        return [
+            (img, self._boxes_from_result(results[i] if i < len(results) else None, img))
+            for i, img in enumerate(imgs)
+        ]
 
-        output = []
-        for x1, y1, x2, y2 in boxes:
-            crop = img.crop((int(x1), int(y1), int(x2), int(y2)))
-            output.append((crop, [float(x1), float(y1), float(x2), float(y2)]))
-        return output
+    def crop_bluebooks(self, image_path: str) -> List[Tuple[Image.Image, Box]]:
+        img, bboxes = self.detect_bluebooks(image_path)
+        if len(bboxes) == 1 and bboxes[0] == (0, 0, *img.size):
+            return [(img, bboxes[0])]
+        return [(img.crop(box), box) for box in bboxes]
@@ -1,13 +1,35 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import re
-from dataclasses import dataclass, asdict
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, replace
 from typing import Dict, Any, Optional, List
 
 import numpy as np
 from PIL import Image
 import easyocr
 
+# ---------- PRECOMPILED PATTERNS ----------
+# USN normalisation in one C-level pass: uppercase ASCII letters, drop everything not A–Z / 0–9
+_USN_UPPER = bytes.maketrans(b"abcdefghijklmnopqrstuvwxyz", b"ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+_USN_DROP = bytes(c for c in range(256) if not (48 <= c <= 57 or 65 <= c <= 90 or 97 <= c <= 122))
+_RE_USN = re.compile(r"1MS22CS[0-9]{3}")
+_RE_USN_FALLBACK = re.compile(r"USN[:\s]+([A-Za-z0-9]+)", re.IGNORECASE)
+_RE_COURSE_CODE = re.compile(r"\b([A-Z]{2,4}\d{2,3}[A-Z]?)\b")
+_RE_LABEL = re.compile(r"COURSE CODE[^:]*[:\-]?", re.IGNORECASE)
+_RE_SMALLNUM = re.compile(r"\b\d{1,2}\b")
+
+# An upright read at least this long and confident skips the other orientations
+UPRIGHT_MIN_CHARS = 50
+UPRIGHT_MIN_CONF = 0.7
+
+# OCR result cache, exact pixel hash only: cover crops share one printed template
+# and differ just in handwriting, so a near-duplicate match could be another student
+OCR_CACHE_SIZE = 1024
+
 
 @dataclass
 class BluebookResult:
@@ -22,133 +44,189 @@ class BluebookResult:
         return asdict(self)
 
 
+class _OCRCache:
+    """In-memory LRU of OCR results keyed by an exact hash of the crop pixels."""
+
+    def __init__(self, max_entries: int = OCR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, BluebookResult]" = OrderedDict()
+
+    @staticmethod
+    def key(img: Image.Image) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{img.mode}{img.size}".encode())
+        h.update(img.tobytes())
+        return h.hexdigest()
+
+    def get(self, digest: str) -> Optional[BluebookResult]:
+        with self._lock:
+            result = self._entries.get(digest)
+            if result is not None:
+                self._entries.move_to_end(digest)
+            return result
+
+    def put(self, digest: str, result: BluebookResult) -> None:
+        with self._lock:
+            self._entries[digest] = result
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_ocr_cache = _OCRCache()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_reader() -> easyocr.Reader:
+    """Process-wide EasyOCR reader; loading CRAFT + recognizer weights takes seconds."""
+    # GPU=False so it works on any Windows CPU
+    return easyocr.Reader(["en"], gpu=False)
+
+
 class BluebookOCRExtractor:
     """OCR logic for a single cropped Bluebook image, using EasyOCR."""
 
     def __init__(self):
-        # GPU=False so it works on any Windows CPU
-        self.reader = easyocr.Reader(["en"], gpu=False)
+        self.reader = _get_reader()
 
     # ---------- PUBLIC API ----------
 
     def extract_from_pil(self, img: Image.Image, bbox=None) -> BluebookResult:
         img = img.convert("RGB")
 
-        # 1. Try 4 orientations and pick the one with most readable text
-        upright = self._best_orientation(img)
+        # 0. Identical crops reuse the earlier OCR result
+        digest = _ocr_cache.key(img)
+        cached = _ocr_cache.get(digest)
+        if cached is not None:
+            return replace(cached, bbox=bbox)
+
+        # 1. Try 4 orientations and pick the one with most readable text;
+        #    its OCR output is reused, so the page is not read a fifth time
+        results = self._best_orientation(img)
 
-        # 2. OCR on chosen orientation
-        results = self.reader.readtext(np.array(upright))
+        # 2. OCR text of the chosen orientation
         # results: list of [bbox, text, confidence]
         text_lines = [r[1] for r in results]
         full_text = "\n".join(text_lines)
 
-        return BluebookResult(
-            usn=self._extract_usn(full_text),
-            course_code=self._extract_course_code(full_text),
-            course_name=self._extract_course_name(full_text),
+        # 3. Shared views of the text, built once for all field parsers
+        flat = " ".join(full_text.split())
+        windows = self._course_code_windows(full_text)
+
+        result = BluebookResult(
+            usn=self._extract_usn(full_text, flat),
+            course_code=self._extract_course_code(windows, flat),
+            course_name=self._extract_course_name(windows),
             marks_obtained=self._extract_marks(full_text),
             raw_text=full_text,
             bbox=bbox,
         )
+        _ocr_cache.put(digest, result)
+        return result
 
     # ---------- ORIENTATION ----------
 
-    def _best_orientation(self, img: Image.Image) -> Image.Image:
+    def _best_orientation(self, img: Image.Image) -> List[Any]:
         """
         Try 0, 90, 180, 270 degrees and pick the orientation that gives
         the highest 'score' = sum(len(text) * confidence).
+        Returns the OCR results of that orientation.
+
+        Most scans are already upright, so 0° is read first and accepted on
+        its own when the text is long and confident enough. Otherwise the
+        other three rotations go through EasyOCR in one batched call, padded
+        onto the same square white canvas so the batch shares a shape.
+        Quarter turns are np.rot90 views, so no resampling happens.
         """
-        best_img = img
-        best_score = -1
-
-        for angle in (0, 90, 180, 270):
-            rotated = img.rotate(angle, expand=True)
-            try:
-                results = self.reader.readtext(np.array(rotated))
-                score = sum(len(r[1]) * float(r[2]) for r in results)
-                if score > best_score:
-                    best_score = score
-                    best_img = rotated
-            except Exception:
-                continue
-
-        return best_img
+        arr = np.asarray(img)
+        try:
+            upright = self.reader.readtext(arr)
+        except Exception:
+            upright = []
+
+        chars = sum(len(r[1]) for r in upright)
+        mean_conf = sum(float(r[2]) for r in upright) / len(upright) if upright else 0.0
+        if chars >= UPRIGHT_MIN_CHARS and mean_conf >= UPRIGHT_MIN_CONF:
+            return upright
+
+        rotations = [np.rot90(arr, k) for k in (1, 2, 3)]  # k * 90° counter-clockwise, like Image.rotate
+        side = max(img.size)
+
+        batch = []
+        for rotated in rotations:
+            canvas = np.full((side, side, 3), 255, dtype=arr.dtype)
+            canvas[:rotated.shape[0], :rotated.shape[1]] = rotated
+            batch.append(canvas)
+
+        try:
+            batched = self.reader.readtext_batched(batch, n_width=side, n_height=side)
+        except Exception:
+            batched = []
+
+        candidates = [upright] + list(batched)
+        return max(candidates, key=lambda results: sum(len(r[1]) * float(r[2]) for r in results))
 
     # ---------- FIELD PARSERS ----------
 
-    def _extract_usn(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _course_code_windows(text: str) -> List[List[str]]:
+        """Each line mentioning 'COURSE CODE' together with the (up to) two lines after it."""
+        lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
+        return [lines[i:i + 3] for i, ln in enumerate(lines) if "COURSE CODE" in ln.upper()]
+
+    def _extract_usn(self, text: str, flat: str) -> Optional[str]:
         """
         Strong preference: pattern 1MS22CSxxx (your batch).
         Fallback: generic 'USN: <token>'.
         """
         # normalize to only A–Z, 0–9
-        norm = re.sub(r"[^A-Z0-9]", "", text.upper())
+        norm = text.encode("ascii", "ignore").translate(_USN_UPPER, _USN_DROP).decode("ascii")
 
         # 1) Exact batch pattern
-        m = re.search(r"1MS22CS[0-9]{3}", norm)
+        m = _RE_USN.search(norm)
         if m:
             return m.group(0)
 
         # 2) Fallback: look near 'USN'
-        t = " ".join(text.split())
-        m2 = re.search(r"USN[:\s]+([A-Za-z0-9]+)", t, re.IGNORECASE)
+        m2 = _RE_USN_FALLBACK.search(flat)
         if m2:
             return m2.group(1).upper()
 
         return None
 
-    def _extract_course_code(self, text: str) -> Optional[str]:
+    def _extract_course_code(self, windows: List[List[str]], flat: str) -> Optional[str]:
         """
         Try to find course code near 'COURSE CODE'.
         Pattern: AA123, CS52, AI52A, etc.
         """
-        lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
-        for i, ln in enumerate(lines):
-            if "COURSE CODE" in ln.upper():
-                window = ln
-                if i + 1 < len(lines):
-                    window += " " + lines[i + 1]
-                if i + 2 < len(lines):
-                    window += " " + lines[i + 2]
-
-                window = " ".join(window.split())
-                m = re.search(r"\b([A-Z]{2,4}\d{2,3}[A-Z]?)\b", window)
-                if m:
-                    return m.group(1).upper()
+        for window_lines in windows:
+            window = " ".join(" ".join(window_lines).split())
+            m = _RE_COURSE_CODE.search(window)
+            if m:
+                return m.group(1).upper()
 
         # fallback: anywhere in the text
-        t = " ".join(text.split())
-        m2 = re.search(r"\b([A-Z]{2,4}\d{2,3}[A-Z]?)\b", t)
+        m2 = _RE_COURSE_CODE.search(flat)
         return m2.group(1).upper() if m2 else None
 
-    def _extract_course_name(self, text: str) -> Optional[str]:
+    def _extract_course_name(self, windows: List[List[str]]) -> Optional[str]:
         """
         Extract course name from the 'COURSE CODE & NAME' line and its
         following 1–2 lines, after removing label + course code.
         """
-        lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
-        for i, ln in enumerate(lines):
-            if "COURSE CODE" in ln.upper():
-                window_lines = [ln]
-                if i + 1 < len(lines):
-                    window_lines.append(lines[i + 1])
-                if i + 2 < len(lines):
-                    window_lines.append(lines[i + 2])
-
-                window = " ".join(window_lines)
+        for window_lines in windows:
+            window = " ".join(window_lines)
 
-                # Remove label
-                window = re.sub(
-                    r"COURSE CODE[^:]*[:\-]?", "", window, flags=re.IGNORECASE
-                )
+            # Remove label
+            window = _RE_LABEL.sub("", window)
 
-                # Remove any obvious code-like token
-                window = re.sub(r"\b[A-Z]{2,4}\d{2,3}[A-Z]?\b", "", window)
+            # Remove any obvious code-like token
+            window = _RE_COURSE_CODE.sub("", window)
 
-                name = window.strip(" :-")
-                if name:
-                    return name
+            name = window.strip(" :-")
+            if name:
+                return name
 
         return None
 
@@ -159,6 +237,4 @@ class BluebookOCRExtractor:
         - Filter 0–30
         - Take max as 'marks obtained'
         """
-        nums = [int(m) for m in re.findall(r"\b\d{1,2}\b", text)]
-        valid = [n for n in nums if 0 <= n <= 30]
-        return max(valid) if valid else None
+        return max((n for n in map(int, _RE_SMALLNUM.findall(text)) if n <= 30), default=None)
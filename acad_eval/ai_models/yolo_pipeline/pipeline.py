@@ -1,18 +1,26 @@
 # Add these imports near the top of your file
 import os
 import io
+import asyncio
+import queue
+import threading
+import time
 import base64
-import json
 import PIL.Image
 from google import genai
 from google.genai import types
 from google.genai import Client # <-- MODERN API CLIENT
-import cv2
 import numpy as np
 import re # <-- REGEX IMPORT ADDED
+import atexit
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import cv2
 from ultralytics import YOLO
+from ultralytics.utils.plotting import Annotator, colors
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Union
+from typing import List, Tuple, Dict, Any, Iterator, Optional, Union
 
 # ---------------- CONFIG ----------------
 # Get the project root directory, which is three levels up from this file's directory
@@ -45,6 +53,10 @@ except ImportError:
         except:
             pass
 
+from ai_models.llm_evaluation._retry import gemini_retry
+from ai_models.llm_evaluation._common import _gemini_text, json_loads, json_pretty
+from ai_models.llm_evaluation._client import get_client
+
 # Pick a model you have access to
 GEMINI_MODEL = "gemini-2.5-flash"
 
@@ -54,6 +66,22 @@ OUTPUT_PROJECT = str(OUTPUT_PROJECT_PATH) # Use the relative path
 CONF_THRESHOLD = 0.25
 OUTPUT_NAME = "bluebook_test"
 BLUEBOOK_CLUSTER_THRESHOLD_Y = 1000 # High threshold for single document mode
+USN_PATTERN = re.compile(r"^[1I]MS(22|23)CS\d{3}$")
+
+# Detected boxes of one page as parallel arrays:
+# {"cls": int32[N] class ids, "xyxy": float32[N, 4] corners}
+Boxes = Dict[str, np.ndarray]
+
+# Parallelism across images: YOLO worker processes, and Gemini pages sent together
+# once GEMINI_BATCH are queued or the oldest has waited GEMINI_BATCH_MAX_WAIT seconds
+PIPELINE_WORKERS = int(os.environ.get("EDULENS_PIPELINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+GEMINI_BATCH = int(os.environ.get("EDULENS_GEMINI_CONCURRENCY", "8"))
+GEMINI_BATCH_MAX_WAIT = 0.5
+# Crops are sent to Gemini as JPEG at this quality, longest edge capped at GEMINI_MAX_EDGE px
+JPEG_QUALITY = 85
+GEMINI_MAX_EDGE = 1600
+# Upper bound on images stacked into one YOLO forward pass
+YOLO_MAX_BATCH = int(os.environ.get("EDULENS_YOLO_BATCH", "16"))
 
 # ----------------------------
 # Fallback Image Processing (Kept for compatibility)
@@ -106,16 +134,64 @@ VERY IMPORTANT RULES:
 - Return ONLY valid JSON.
 """
 
+# Used when one page holds several bluebooks: every crop goes out in a single request.
+GEMINI_PROMPT_MULTI_BLUEBOOK = """
+You are analyzing {count} crops of Blue Book internal assessment sheets, given in order
+after this prompt. Each crop contains exactly ONE Blue Book; crop_index is its 0-based
+position in that order.
+
+Each crop contains:
+- The printed form fields (USN, COURSE CODE & NAME, Marks Grid).
+- Handwritten student data and marks.
+- **IMPORTANT**: The crops have **colored bounding boxes** drawn around the fields. USE these boxes as strong visual anchors to precisely locate and read the handwritten data.
+
+For EVERY crop:
+
+1. Locate the field "USN" and read the Student Registration Number.
+2. Locate "COURSE CODE & NAME" and extract ONLY the subject code (e.g., CS533, 21CS34, etc.)
+3. Locate the internal marks grid. Extract marks for T1 and T2.
+
+Return the result strictly in this JSON structure, with one entry per crop:
+
+{{
+  "bluebooks": [
+    {{
+      "crop_index": 0,
+      "usn": "...",
+      "subject_code": "...",
+      "cie_marks": {{
+        "T1": {{
+          "Q1": {{ "a": "...", "b": "...", "c": "..." , "d": "..." }},
+          "Q2": {{ "a": "...", "b": "...", "c": "..." , "d": "..." }},
+          "Q3": {{ "a": "...", "b": "...", "c": "..." , "d": "..." }}
+        }},
+        "T2": {{
+          "Q1": {{ "a": "...", "b": "...", "c": "..." , "d": "..." }},
+          "Q2": {{ "a": "...", "b": "...", "c": "..." , "d": "..." }},
+          "Q3": {{ "a": "...", "b": "...", "c": "..." , "d": "..." }}
+        }}
+      }}
+    }}
+  ]
+}}
+
+VERY IMPORTANT RULES:
+- If any value is missing, use null
+- DO NOT return explanations or any text outside of the JSON object.
+- Return ONLY valid JSON.
+"""
+
 # ----------------------------
 # Helper: create Gemini client
 # ----------------------------
 def make_gemini_client(api_key: str = API_KEY) -> Client:
-    """Create Gemini client using the modern google-genai SDK."""
+    """Returns the shared Gemini client (google-genai SDK); a different key gets its own."""
     if not api_key or api_key == "YOUR_API_KEY_HERE":
         raise ValueError("Gemini API key is not configured.")
     try:
-        client = Client(api_key=api_key)
-        return client
+        if api_key == API_KEY:
+            return get_client()
+        return Client(api_key=api_key)
     except ImportError:
         raise RuntimeError("google-genai not installed. Run: pip install google-genai")
     except Exception as e:
@@ -124,31 +200,76 @@ def make_gemini_client(api_key: str = API_KEY) -> Client:
 # ----------------------------
 # Helper: call Gemini on a PIL image and parse JSON
 # ----------------------------
+# Strict JSON out, and deterministic reads of the same crop
+_GEMINI_CONFIG = types.GenerateContentConfig(response_mime_type="application/json", temperature=0)
+
+
+@gemini_retry
+def _generate_content(client: Client, model: str, contents: List[Any]):
+    return client.models.generate_content(model=model, contents=contents, config=_GEMINI_CONFIG)
+
+
+@gemini_retry
+async def _agenerate_content(client: Client, model: str, contents: List[Any]):
+    return await client.aio.models.generate_content(model=model, contents=contents, config=_GEMINI_CONFIG)
+
+
+def _image_part(image: PIL.Image.Image) -> types.Part:
+    """Encodes a crop to JPEG once, so retries resend the same bytes instead of re-encoding."""
+    # Gemini tiles images down anyway; full-resolution phone crops only cost upload time
+    scale = GEMINI_MAX_EDGE / max(image.size)
+    if scale < 1:
+        w, h = image.size
+        image = image.resize((max(1, int(w * scale)), max(1, int(h * scale))), PIL.Image.LANCZOS)
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=JPEG_QUALITY)
+    return types.Part.from_bytes(data=buf.getvalue(), mime_type="image/jpeg")
+
+
+def _image_contents(prompt_text: str, images: List[PIL.Image.Image]) -> List[Any]:
+    return [prompt_text, *(_image_part(img) for img in images)]
+
+
 def call_gemini_for_pil_image(
-    pil_image: PIL.Image.Image, 
+    pil_image: Union[PIL.Image.Image, List[PIL.Image.Image]],
     client: Client, 
     prompt_text: str, 
     model: str = GEMINI_MODEL
 ) -> Dict[str, Any]:
-    """Sends one PIL image + prompt to Gemini Vision."""
+    """Sends one PIL image (or several, in one request) + prompt to Gemini Vision."""
+    images = pil_image if isinstance(pil_image, list) else [pil_image]
     try:
-        response = client.models.generate_content(
-            model=model,
-            contents=[prompt_text, pil_image]
-        )
+        response = _generate_content(client, model, _image_contents(prompt_text, images))
     except Exception as e:
         return {"error": f"gemini call failed: {e}"}
 
-    json_text = response.text.strip()
-    
+    return _parse_gemini_json(_gemini_text(response).strip())
+
+
+async def acall_gemini_for_pil_image(
+    images: List[PIL.Image.Image],
+    client: Client,
+    prompt_text: str,
+    model: str = GEMINI_MODEL
+) -> Dict[str, Any]:
+    """Async variant of `call_gemini_for_pil_image`, for concurrent in-flight calls."""
     try:
-        return json.loads(json_text)
+        response = await _agenerate_content(client, model, _image_contents(prompt_text, images))
+    except Exception as e:
+        return {"error": f"gemini call failed: {e}"}
+
+    return _parse_gemini_json(_gemini_text(response).strip())
+
+
+def _parse_gemini_json(json_text: str) -> Dict[str, Any]:
+    try:
+        return json_loads(json_text)
     except Exception:
         start = json_text.find("{")
         end = json_text.rfind("}")
         if start != -1 and end != -1 and end > start:
             try:
-                return json.loads(json_text[start:end+1])
+                return json_loads(json_text[start:end+1])
             except Exception as e:
                 return {"error": f"json parse failed after substring attempt: {e}", "raw": json_text}
         return {"error": "could not parse gemini response as JSON", "raw": json_text}
@@ -156,9 +277,9 @@ def call_gemini_for_pil_image(
 # ----------------------------
 # Helper: Cluster detected boxes (Restored to Simple Single-Cluster Mode)
 # ----------------------------
-def cluster_boxes_into_bluebooks(all_boxes_data: List[Tuple[int, float, float, float, float]]) -> List[List[Tuple[int, float, float, float, float]]]:
+def cluster_boxes_into_bluebooks(all_boxes_data: Boxes) -> List[Boxes]:
     """Returns all detected boxes in a single cluster, assuming a single document."""
-    if not all_boxes_data:
+    if len(all_boxes_data["cls"]) == 0:
         return []
     
     # Return a list containing a single list of all boxes
@@ -167,64 +288,124 @@ def cluster_boxes_into_bluebooks(all_boxes_data: List[Tuple[int, float, float, f
 # ----------------------------
 # Helper: Get the overall bounding box for a cluster
 # ----------------------------
-def get_cluster_bbox(cluster: List[Tuple[int, float, float, float, float]]) -> Tuple[int, int, int, int]:
+def get_cluster_bbox(cluster: Boxes) -> Tuple[int, int, int, int]:
     """Returns (x1, y1, x2, y2) encompassing all boxes in the cluster."""
-    if not cluster:
+    xyxy = cluster["xyxy"]
+    if len(xyxy) == 0:
         return 0, 0, 0, 0
-    x1 = int(min(b[1] for b in cluster))
-    y1 = int(min(b[2] for b in cluster))
-    x2 = int(max(b[3] for b in cluster))
-    y2 = int(max(b[4] for b in cluster))
-    return x1, y1, x2, y2
+    x1, y1 = xyxy[:, :2].min(axis=0)
+    x2, y2 = xyxy[:, 2:].max(axis=0)
+    return int(x1), int(y1), int(x2), int(y2)
 
 # ----------------------------
 # YOLO Execution and Box Extraction
 # ----------------------------
-def run_yolo_and_extract_boxes(
-    image_path: str, model_path: str, output_project: str, conf_threshold: float
-) -> Tuple[Path, List[Tuple[int, float, float, float, float]]]:
-    """Runs YOLO prediction and returns the path to the visualized image and box data."""
-    model = YOLO(model_path)
-    
+def _result_boxes(r) -> Boxes:
+    """Box data of one YOLO result."""
+    return {
+        "cls": r.boxes.cls.cpu().numpy().astype(np.int32),
+        "xyxy": r.boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+    }
+
+
+def _result_to_page(r) -> Tuple[np.ndarray, Boxes]:
+    """Visualized image (RGB, rendered in memory) and box data of one YOLO result."""
+    # plot() returns BGR; the [..., ::-1] view gives RGB without a copy
+    visualized_img_rgb = r.plot(labels=False, conf=False)[..., ::-1]
+    return visualized_img_rgb, _result_boxes(r)
+
+
+def _annotate_page(image_path: str, all_boxes_data: Boxes) -> np.ndarray:
+    """Re-renders what `r.plot(labels=False, conf=False)` draws, from the box data alone."""
+    img = cv2.imread(image_path)
+    if img is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    annotator = Annotator(img)
+    for c, box in zip(all_boxes_data["cls"], all_boxes_data["xyxy"]):
+        annotator.box_label(box, "", color=colors(int(c), True))
+    return annotator.result()[..., ::-1]
+
+
+def iter_yolo_batch(
+    image_paths: List[str], model_path: str, conf_threshold: float, render: bool = True
+) -> Iterator[Tuple[Optional[np.ndarray], Boxes]]:
+    """
+    Runs YOLO over several images in one predict call (stacked into batches of
+    up to YOLO_MAX_BATCH) and yields (visualized_img_rgb, boxes) per image, in
+    input order. Results are streamed, so each Results object (with its copy of
+    the original image) is released before the next one is produced.
+    With render=False only the boxes are produced (the image is None).
+    """
+    model = _load_yolo(model_path)
+
     results = model.predict(
-        source=image_path, 
-        conf=conf_threshold, 
-        show_labels=False,
-        save_conf=True, 
-        save=True, 
-        project=output_project, 
-        name=OUTPUT_NAME, 
-        exist_ok=True
+        source=list(image_paths),
+        batch=max(1, min(len(image_paths), YOLO_MAX_BATCH)),
+        stream=True,
+        conf=conf_threshold,
+        save=False,
+        save_conf=False,
+        verbose=False,
     )
 
-    yolo_run_dir = Path(results[0].save_dir)
-    visualized_image_path = yolo_run_dir / Path(image_path).name
-    
-    all_boxes_data = []
     for r in results:
-        boxes = r.boxes.xyxy.cpu().numpy()
-        class_ids = r.boxes.cls.cpu().numpy().astype(int)
-        for cls_id, box in zip(class_ids, boxes):
-            all_boxes_data.append((cls_id, *box))
-            
-    return visualized_image_path, all_boxes_data
+        yield _result_to_page(r) if render else (None, _result_boxes(r))
+
+
+def run_yolo_batch(
+    image_paths: List[str], model_path: str, conf_threshold: float
+) -> List[Tuple[np.ndarray, Boxes]]:
+    """List form of `iter_yolo_batch`."""
+    return list(iter_yolo_batch(image_paths, model_path, conf_threshold))
+
+
+def run_yolo_and_extract_boxes(
+    image_path: str, model_path: str, output_project: str, conf_threshold: float
+) -> Tuple[np.ndarray, Boxes]:
+    """
+    Runs YOLO prediction and returns the visualized image (RGB array with the
+    boxes drawn, rendered in memory) and the box data.
+    Nothing is written to disk any more; output_project is kept only so
+    existing callers keep working.
+    """
+    return run_yolo_batch([image_path], model_path, conf_threshold)[0]
 
 # ----------------------------
-# Gemini Processing for a single bluebook
+# Gemini Processing for the bluebooks of one page
 # ----------------------------
+def _crop_cluster(
+    cluster: Boxes,
+    visualized_img_rgb: np.ndarray,
+    pad: int = 50
+) -> Tuple[np.ndarray, List[int]]:
+    """Returns the padded crop around a cluster and its [x1, y1, x2, y2] in page coords."""
+    x1_bb, y1_bb, x2_bb, y2_bb = get_cluster_bbox(cluster)
+
+    x1_crop, y1_crop = max(0, x1_bb - pad), max(0, y1_bb - pad)
+    x2_crop, y2_crop = min(visualized_img_rgb.shape[1], x2_bb + pad), min(visualized_img_rgb.shape[0], y2_bb + pad)
+
+    # Copy only the cropped region into contiguous memory (the page may be a strided view)
+    crop = np.ascontiguousarray(visualized_img_rgb[y1_crop:y2_crop, x1_crop:x2_crop])
+    return crop, [x1_crop, y1_crop, x2_crop, y2_crop]
+
+
+def _validate_usn(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalizes common O/0 and I/1 confusions when the USN matches the batch pattern."""
+    usn_raw = result.get("usn")
+    if usn_raw and isinstance(usn_raw, str):
+        cleaned_usn = usn_raw.upper().strip().replace('O', '0').replace('I', '1')
+        if USN_PATTERN.match(cleaned_usn):
+            result["usn"] = cleaned_usn
+    return result
+
+
 def process_single_bluebook_with_gemini(
-    cluster: List[Tuple[int, float, float, float, float]],
+    cluster: Boxes,
     visualized_img_rgb: np.ndarray,
     client: Client
 ) -> Dict[str, Any]:
     """Crops a bluebook from the image and sends it to Gemini for extraction."""
-    x1_bb, y1_bb, x2_bb, y2_bb = get_cluster_bbox(cluster)
-    
-    pad = 50 
-    x1_crop, y1_crop = max(0, x1_bb - pad), max(0, y1_bb - pad)
-    x2_crop, y2_crop = min(visualized_img_rgb.shape[1], x2_bb + pad), min(visualized_img_rgb.shape[0], y2_bb + pad)
-    
-    crop = visualized_img_rgb[y1_crop:y2_crop, x1_crop:x2_crop]
+    crop, _ = _crop_cluster(cluster, visualized_img_rgb)
     
     if crop.size == 0:
         return {"error": "Crop size is zero."}
@@ -232,15 +413,268 @@ def process_single_bluebook_with_gemini(
     pil_crop = PIL.Image.fromarray(crop)
     result = call_gemini_for_pil_image(pil_crop, client, prompt_text=GEMINI_PROMPT_SINGLE_BLUEBOOK, model=GEMINI_MODEL)
     
-    # --- USN Validation ---
-    usn_raw = result.get("usn")
-    if usn_raw and isinstance(usn_raw, str):
-        cleaned_usn = usn_raw.upper().strip().replace('O', '0').replace('I', '1')
-        usn_pattern = r"^[1I]MS(22|23)CS\d{3}$"
-        if re.match(usn_pattern, cleaned_usn):
-            result["usn"] = cleaned_usn
-    
-    return result
+    return _validate_usn(result)
+
+
+def process_bluebooks_with_gemini(
+    clusters: List[Boxes],
+    visualized_img_rgb: np.ndarray,
+    client: Client
+) -> List[Dict[str, Any]]:
+    """
+    Extracts every bluebook on one page with a single Gemini call.
+    Each result carries the crop's page coordinates in `_bbox` for provenance.
+    """
+    crops, bboxes = _prepare_page(clusters, visualized_img_rgb)
+    if not crops:
+        return [{"error": "Crop size is zero."}]
+
+    response = call_gemini_for_pil_image(crops, client, prompt_text=_page_prompt(len(crops)), model=GEMINI_MODEL)
+    return _page_results(response, bboxes)
+
+
+def _prepare_page(
+    clusters: List[Boxes],
+    visualized_img_rgb: np.ndarray
+) -> Tuple[List[PIL.Image.Image], List[List[int]]]:
+    """Crops every non-empty cluster of a page into a PIL image plus its page bbox."""
+    crops, bboxes = [], []
+    for cluster in clusters:
+        crop, bbox = _crop_cluster(cluster, visualized_img_rgb)
+        if crop.size == 0:
+            continue
+        crops.append(PIL.Image.fromarray(crop))
+        bboxes.append(bbox)
+    return crops, bboxes
+
+
+def _page_prompt(crop_count: int) -> str:
+    if crop_count == 1:
+        return GEMINI_PROMPT_SINGLE_BLUEBOOK
+    return GEMINI_PROMPT_MULTI_BLUEBOOK.format(count=crop_count)
+
+
+def _page_results(response: Dict[str, Any], bboxes: List[List[int]]) -> List[Dict[str, Any]]:
+    """Turns the Gemini response for one page into per-bluebook results with `_bbox`."""
+    if "error" in response:
+        return [response]
+
+    if len(bboxes) == 1:
+        response["_bbox"] = bboxes[0]
+        return [_validate_usn(response)]
+
+    results = []
+    for i, result in enumerate(response.get("bluebooks") or []):
+        if not isinstance(result, dict):
+            continue
+        idx = result.pop("crop_index", i)
+        if isinstance(idx, int) and 0 <= idx < len(bboxes):
+            result["_bbox"] = bboxes[idx]
+        results.append(_validate_usn(result))
+    return results
+
+# ----------------------------
+# Per-image work units (run in the worker pools)
+# ----------------------------
+@functools.lru_cache(maxsize=2)
+def _load_yolo(model_path: str) -> YOLO:
+    """One resident YOLO model per weights file and process."""
+    return YOLO(model_path)
+
+
+def _init_worker(model_path: str) -> None:
+    """Process-pool initializer: load the weights before the first task arrives."""
+    _load_yolo(model_path)
+
+
+# Long-lived YOLO worker pool, shared by every pipeline run in this process
+_yolo_pool: Optional[ProcessPoolExecutor] = None
+_yolo_pool_lock = threading.Lock()
+
+
+def _get_yolo_pool(model_path: str) -> ProcessPoolExecutor:
+    """
+    The shared YOLO pool, created on first use with each worker loading the weights once.
+
+    Workers are spawned, not forked: by the time a pool is needed the parent may
+    be running the Gemini event loop and stage threads, or hold YOLO on the GPU,
+    none of which is safe to fork. Other weights files load lazily per worker.
+    """
+    global _yolo_pool
+    with _yolo_pool_lock:
+        # A crashed worker breaks the pool for good; replace it
+        if _yolo_pool is None or getattr(_yolo_pool, "_broken", False):
+            _yolo_pool = ProcessPoolExecutor(
+                max_workers=PIPELINE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_path,),
+            )
+            atexit.register(_yolo_pool.shutdown)
+        return _yolo_pool
+
+
+def _iter_yolo_chunk(
+    image_paths: List[str], model_path: str, conf_threshold: float, render: bool = True
+) -> Iterator[Tuple[str, Optional[np.ndarray], Boxes, str]]:
+    """
+    YOLO stage for a chunk of images, batched into one streamed predict call:
+    yields (image_path, visualized_img_rgb, boxes, error) as each page is done.
+    """
+    done = 0
+    try:
+        for img, boxes in iter_yolo_batch(image_paths, model_path, conf_threshold, render):
+            yield image_paths[done], img, boxes, ""
+            done += 1
+    except Exception as e:
+        # One unreadable image fails the rest of the batch; retry those image by image
+        rest = image_paths[done:]
+        if len(rest) == 1:
+            yield rest[0], None, {}, str(e)
+            return
+        for path in rest:
+            yield from _iter_yolo_chunk([path], model_path, conf_threshold, render)
+
+
+def _yolo_chunk(
+    image_paths: List[str], model_path: str, conf_threshold: float
+) -> List[Tuple[str, Optional[np.ndarray], Boxes, str]]:
+    """
+    Process-pool form of `_iter_yolo_chunk`. The chunk comes back as one pickled
+    list, so it carries boxes only; the parent's crop stage re-renders the pages.
+    """
+    return list(_iter_yolo_chunk(image_paths, model_path, conf_threshold, render=False))
+
+
+def _load_page_crops(
+    image_path: str,
+    visualized_img_rgb: np.ndarray,
+    all_boxes_data: Boxes
+) -> Optional[Tuple[List[PIL.Image.Image], List[List[int]]]]:
+    """Crop stage for one image: cluster boxes and cut the bluebook crops."""
+    # 2. Cluster boxes
+    bluebook_clusters = cluster_boxes_into_bluebooks(all_boxes_data)
+    if not bluebook_clusters:
+        print(f"No bluebooks detected in {image_path}")
+        return None
+
+    # 3. Crop from the in-memory visualized image
+    crops, bboxes = _prepare_page(bluebook_clusters, visualized_img_rgb)
+    return (crops, bboxes) if crops else None
+
+
+async def _extract_batch(
+    pages: List[Tuple[int, str, List[PIL.Image.Image], List[List[int]]]],
+    page_results: Dict[int, List[Dict[str, Any]]],
+    client: Client
+) -> None:
+    """Gemini stage: one concurrent request per page in the mini-batch."""
+    responses = await asyncio.gather(*[
+        _acall_limited(crops, client, _page_prompt(len(crops)))
+        for _, _, crops, _ in pages
+    ])
+    for (idx, image_path, _, bboxes), response in zip(pages, responses):
+        found = []
+        for result in _page_results(response, bboxes):
+            if "error" not in result and result.get('usn') and result.get('usn') != 'null':
+                # Add source image info for tracking; the index is the image's
+                # position in the run's input list (basenames can repeat)
+                result['_source_image'] = str(Path(image_path).name)
+                result['_source_index'] = idx
+                found.append(result)
+        page_results[idx] = found
+
+
+# ----------------------------
+# Pipeline stages (threads joined by bounded queues)
+# ----------------------------
+_STOP = object()
+
+# One long-lived event loop for the async Gemini client, whose pooled
+# connections are bound to the loop they were opened on.
+_aio_loop = None
+_aio_lock = threading.Lock()
+# Caps in-flight Gemini requests across all mini-batches; created on the loop thread
+_gemini_slots: Optional[asyncio.Semaphore] = None
+
+
+async def _acall_limited(
+    crops: List[PIL.Image.Image], client: Client, prompt_text: str
+) -> Dict[str, Any]:
+    global _gemini_slots
+    if _gemini_slots is None:
+        _gemini_slots = asyncio.Semaphore(GEMINI_BATCH)
+    async with _gemini_slots:
+        return await acall_gemini_for_pil_image(crops, client, prompt_text=prompt_text)
+
+
+def _get_aio_loop() -> asyncio.AbstractEventLoop:
+    global _aio_loop
+    with _aio_lock:
+        if _aio_loop is None:
+            _aio_loop = asyncio.new_event_loop()
+            threading.Thread(target=_aio_loop.run_forever, name="gemini-aio", daemon=True).start()
+        return _aio_loop
+
+
+def _crop_stage(in_q: "queue.Queue", out_q: "queue.Queue") -> None:
+    while True:
+        item = in_q.get()
+        if item is _STOP:
+            out_q.put(_STOP)
+            return
+        idx, image_path, visualized_img_rgb, all_boxes_data = item
+        try:
+            if visualized_img_rgb is None:
+                # Page from a pool worker: only its boxes crossed the process boundary
+                visualized_img_rgb = _annotate_page(image_path, all_boxes_data)
+            page = _load_page_crops(image_path, visualized_img_rgb, all_boxes_data)
+        except Exception as e:
+            print(f"Error cropping {image_path}: {e}")
+            page = None
+        if page is not None:
+            out_q.put((idx, image_path, *page))
+
+
+def _gemini_stage(in_q: "queue.Queue", page_results: Dict[int, List[Dict[str, Any]]], client: Client) -> None:
+    """
+    Sends pages in mini-batches: when GEMINI_BATCH are waiting or the oldest has
+    waited long enough. Batches are not awaited one by one; they overlap on the
+    event loop, bounded by the shared semaphore, and are collected at the end.
+    """
+    loop = _get_aio_loop()
+    in_flight = []
+    pending = []
+    oldest = 0.0
+    done = False
+    while not done:
+        timeout = None
+        if pending:
+            timeout = max(0.0, GEMINI_BATCH_MAX_WAIT - (time.monotonic() - oldest))
+        try:
+            item = in_q.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+
+        if item is _STOP:
+            done = True
+        elif item is not None:
+            if not pending:
+                oldest = time.monotonic()
+            pending.append(item)
+
+        if pending and (done or item is None or len(pending) >= GEMINI_BATCH):
+            in_flight.append(asyncio.run_coroutine_threadsafe(
+                _extract_batch(pending, page_results, client), loop
+            ))
+            pending = []
+
+    for future in in_flight:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error calling Gemini: {e}")
+
 
 # ----------------------------
 # Main Pipeline Orchestration
@@ -254,6 +688,12 @@ def run_pipeline_and_call_gemini(
     """
     Runs YOLO, clusters boxes, and sends crops to Gemini for data extraction.
     Supports processing multiple images and aggregating results.
+
+    Three stages overlap: YOLO (one batched predict per chunk of images, in
+    the shared worker pool when there are several, each worker with its own
+    resident model), cropping, and Gemini calls
+    sent as concurrent mini-batches. Network waits therefore overlap with
+    detection. Results keep the input image order.
     """
     if isinstance(image_paths, str):
         image_paths = [image_paths]
@@ -265,43 +705,54 @@ def run_pipeline_and_call_gemini(
         return {"error": str(e)}
 
     aggregated_data = {"bluebooks": []}
-    visualized_images = []
-    
-    # Process each image
-    for image_path in image_paths:
-        print(f"Processing: {image_path}")
-        
-        # 1. Run YOLO and get box data
-        try:
-            visualized_image_path, all_boxes_data = run_yolo_and_extract_boxes(
-                image_path, model_path, output_project, conf_threshold
+    page_results: Dict[int, List[Dict[str, Any]]] = {}
+
+    # Contiguous chunks, one per worker, each run as a single batched predict
+    workers = min(PIPELINE_WORKERS, len(image_paths))
+    chunk_size = -(-len(image_paths) // max(workers, 1))
+    chunks = [image_paths[i:i + chunk_size] for i in range(0, len(image_paths), chunk_size)]
+
+    # Before the stage threads start, so the first run's pool comes up in a quiet process
+    yolo_pool = _get_yolo_pool(model_path) if workers > 1 else None
+
+    crop_q = queue.Queue(maxsize=2 * GEMINI_BATCH)
+    gemini_q = queue.Queue(maxsize=2 * GEMINI_BATCH)
+    stages = [
+        threading.Thread(target=_crop_stage, args=(crop_q, gemini_q), daemon=True),
+        threading.Thread(target=_gemini_stage, args=(gemini_q, page_results, client), daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+
+    # 1. Run YOLO and get box data (in worker processes when there are several images)
+    try:
+        if yolo_pool is not None:
+            chunk_results = yolo_pool.map(
+                _yolo_chunk, chunks,
+                [model_path] * len(chunks), [conf_threshold] * len(chunks)
             )
-            visualized_images.append(str(visualized_image_path))
-        except Exception as e:
-            print(f"Error processing {image_path}: {e}")
-            continue
+        else:
+            # Inline, pages reach the crop stage as soon as YOLO streams them out
+            chunk_results = (
+                _iter_yolo_chunk(chunk, model_path, conf_threshold) for chunk in chunks
+            )
+        yolo_results = (page for chunk in chunk_results for page in chunk)
 
-        # 2. Cluster boxes
-        bluebook_clusters = cluster_boxes_into_bluebooks(all_boxes_data)
-        if not bluebook_clusters:
-            print(f"No bluebooks detected in {image_path}")
-            continue
+        for idx, (image_path, visualized_img_rgb, all_boxes_data, error) in enumerate(yolo_results):
+            print(f"Processing: {image_path}")
+            if error:
+                print(f"Error processing {image_path}: {error}")
+                continue
 
-        # 3. Load the visualized image
-        img_bgr_viz = cv2.imread(str(visualized_image_path))
-        if img_bgr_viz is None:
-             print(f"Could not read visualized image at {visualized_image_path}")
-             continue
-        visualized_img_rgb = cv2.cvtColor(img_bgr_viz, cv2.COLOR_BGR2RGB)
-        
-        # 4. Process each bluebook in the image
-        for cluster in bluebook_clusters:
-            result = process_single_bluebook_with_gemini(cluster, visualized_img_rgb, client)
-            
-            if "error" not in result and result.get('usn') and result.get('usn') != 'null':
-                # Add source image info for tracking
-                result['_source_image'] = str(Path(image_path).name)
-                aggregated_data["bluebooks"].append(result)
+            # 2-4. Crop and Gemini stages pick the page up while YOLO moves on
+            crop_q.put((idx, image_path, visualized_img_rgb, all_boxes_data))
+    finally:
+        crop_q.put(_STOP)
+        for stage in stages:
+            stage.join()
+
+    for idx in sorted(page_results):
+        aggregated_data["bluebooks"].extend(page_results[idx])
 
     # 5. Save and return final results
     # We'll save the combined JSON in the output directory of the last processed image, 
@@ -312,11 +763,9 @@ def run_pipeline_and_call_gemini(
     
     gemini_output_file = output_dir / "combined_gemini_results.json"
     
-    with open(gemini_output_file, "w") as f:
-        json.dump(aggregated_data, f, indent=2)
+    gemini_output_file.write_text(json_pretty(aggregated_data), encoding="utf-8")
 
     return {
-        "visualized_images": visualized_images,
         "gemini_json": str(gemini_output_file),
         "gemini_result": aggregated_data
     }
@@ -345,8 +794,7 @@ if __name__ == "__main__":
         print("\nPipeline result summary:")
         bluebook_count = len(res.get("gemini_result", {}).get("bluebooks", []))
         
-        print(json.dumps({
+        print(json_pretty({
             "total_bluebooks_found": bluebook_count,
-            "visualized_imgs": res.get("visualized_images"),
             "gemini_json": res.get("gemini_json"),
-        }, indent=2))
+        }))
@@ -1,34 +1,24 @@
-import json
-import os
-from datetime import timezone, timedelta
-from google import genai
-from google.genai import types
+from datetime import datetime, timezone
 
 from app.core.database import db_client
-from app.core.config import GEMINI_API_KEY, GRADE_MODEL, now_utc
-
-# Initialize Client
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-# IST Helper
-def get_ist_timezone():
-    return timezone(timedelta(hours=5, minutes=30))
+from app.core.config import GRADE_MODEL, get_ist_timezone, now_utc
+from ai_models.llm_evaluation.evaluator import compute_rubric_set_id, grade_submission
 
 def evaluate_student_submission(student_id: str, report_file_path: str, parsed_rubrics, manual_deadline, manual_max_attempts):
     """
-    Handles DB checks and grading using Gemini 2.5
+    Handles DB checks and grading. Rubric hashing and grading are delegated
+    to `ai_models.llm_evaluation.evaluator` so there is a single implementation.
     """
     if not db_client:
         raise SystemExit("❌ Database client not initialized.")
 
     # --- 1. Compute Set ID & Upsert Metadata ---
-    # Simple hash for ID (simplified for brevity)
-    rubric_set_id = f"rubric_{abs(hash(json.dumps(parsed_rubrics)))}"
+    rubric_set_id = compute_rubric_set_id(parsed_rubrics)
     
     db_client.upsert_rubric_set(rubric_set_id, parsed_rubrics, manual_deadline, manual_max_attempts)
 
     # --- 2. Fetch Authoritative Metadata ---
-    rubric_meta = db_client.get_rubric_meta(rubric_set_id)
+    rubric_meta = db_client.get_rubric_meta_light(rubric_set_id)
     
     stored_deadline = None
     if rubric_meta and rubric_meta.get("deadline"):
@@ -56,47 +46,23 @@ def evaluate_student_submission(student_id: str, report_file_path: str, parsed_r
     if stored_max_attempts is not None and used_attempts >= stored_max_attempts:
         raise SystemExit(f"⛔ Maximum attempts reached.")
 
-    # --- 4. Run Grading (V2 Logic) ---
+    # --- 4. Run Grading (shared evaluator logic) ---
     if not report_file_path:
          raise SystemExit("❌ No report file provided.")
 
     print(f"✅ Processing report: {report_file_path}")
     print("\n🧠 Starting Gemini Grading...")
-    
-    # Upload Student PDF
-    student_file_obj = client.files.upload(path=report_file_path)
-
-    # Grading Prompt
-    grading_prompt = f"""
-    You are a strict grader. 
-    Grade this student submission based ONLY on these rubrics:
-    {json.dumps(parsed_rubrics)}
-
-    Return a JSON object with:
-    - "evaluations": [list of feedback per criteria]
-    - "total_score": (sum of scores)
-    - "feedback": (overall summary)
-    """
 
     try:
-        response = client.models.generate_content(
-            model=GRADE_MODEL, # e.g., "gemini-2.5-flash"
-            contents=[student_file_obj, grading_prompt],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
-        )
-        parsed_result = json.loads(response.text)
+        parsed_result = grade_submission(report_file_path, parsed_rubrics, GRADE_MODEL)
     except Exception as e:
         raise RuntimeError(f"Grading Failed: {e}")
 
-    # --- 5. Save Results ---
-    new_attempt_number = used_attempts + 1
+    # --- 5. Save Results (the attempt number is bumped atomically) ---
     parsed_result["_timestamp"] = now.isoformat()
-    parsed_result["_attempt_number"] = new_attempt_number
 
     mongo_op = db_client.upsert_submission(
-        student_id, rubric_set_id, report_file_path, parsed_rubrics, parsed_result, new_attempt_number
+        student_id, rubric_set_id, report_file_path, parsed_rubrics, parsed_result
     )
 
     return parsed_result, mongo_op, rubric_meta
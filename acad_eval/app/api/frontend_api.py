@@ -3,17 +3,28 @@ Frontend API - Thin bridge between Streamlit UI and Backend Logic.
 Directly imports and uses core logic from ai_models and app.core.
 """
 
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, Iterator, List, Dict, Any, Set, Tuple, Union
 import os
 import certifi
 
 # 💉 FIX: Point to valid SSL certificates to prevent [Errno 2] in pipeline.py
 os.environ["SSL_CERT_FILE"] = certifi.where()
 import sys
+import asyncio
+import hashlib
+import io
 import json
 import secrets
 import re
+import threading
+import weakref
+import atexit
+import logging
+import logging.handlers
+import queue
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 
 # Add parent directory to path for imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
@@ -21,31 +32,86 @@ sys.path.insert(0, project_root)
 
 # --- Core Imports ---
 from app.core.database import db_client
-from app.core.config import GEMINI_API_KEY, RUBRIC_MODEL, GRADE_MODEL, now_utc
+from app.core.config import RUBRIC_MODEL, GRADE_MODEL, now_utc
+
+# --- Logging ---
+# Request threads only enqueue records; a listener thread formats and writes
+# them, so grading calls never block on stdout. EDULENS_LOG_LEVEL=WARNING
+# drops the per-request progress messages entirely.
+logger = logging.getLogger("frontend_api")
+if not logger.handlers:
+    logger.setLevel(os.environ.get("EDULENS_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    _log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    _log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
 
 # --- AI Logic Imports (Reuse existing modules) ---
-# --- AI Logic Imports (Reuse existing modules) ---
-print(f"DEBUG: sys.path: {sys.path}")
+logger.debug("sys.path: %s", sys.path)
 try:
-    print(f"DEBUG: Contents of {project_root}: {os.listdir(project_root)}")
-    print(f"DEBUG: Contents of {os.path.join(project_root, 'ai_models')}: {os.listdir(os.path.join(project_root, 'ai_models'))}")
+    logger.debug("Contents of %s: %s", project_root, os.listdir(project_root))
+    logger.debug("Contents of %s: %s", os.path.join(project_root, 'ai_models'), os.listdir(os.path.join(project_root, 'ai_models')))
 except Exception as e:
-    print(f"DEBUG: Error listing dirs: {e}")
+    logger.debug("Error listing dirs: %s", e)
 
 from ai_models.llm_evaluation.evaluator import (
     extract_rubrics_from_file, 
     compute_rubric_set_id, 
     grade_submission,
-    validate_rubrics_with_llm
+    validate_rubrics_with_llm,
+    GEMINI_CONCURRENCY
 )
 
 from ai_models.llm_evaluation.bluebook_extractor import extract_bluebook_data
+from ai_models.llm_evaluation._common import rubrics_prompt_json, sha256_file
+
+# --- Google GenAI Setup (shared client, used here for rubric file uploads) ---
+from google.genai import types
+from ai_models.llm_evaluation._client import get_client
+
+
+# Rubric PDFs up to this size are sent inline with the request instead of
+# going through the Files API (Gemini caps a whole inline request at 20 MB).
+INLINE_PDF_MAX_BYTES = 15 * 1024 * 1024
 
-# --- Google GenAI Setup (Only for file upload helpers if needed) ---
-import google.generativeai as genai
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+def _upload_shared(pdf: Union[str, bytes]) -> Any:
+    """
+    Uploads a file (path or PDF bytes) to Gemini, or reuses a live upload of
+    the same bytes made by any process (recorded in Mongo). Uploads are left
+    to Gemini's 48 h expiry rather than deleted, so re-processing the same
+    PDF skips the upload.
+    """
+    is_bytes = isinstance(pdf, (bytes, bytearray))
+    file_hash = hashlib.sha256(pdf).hexdigest() if is_bytes else sha256_file(pdf)
+    name = db_client.get_gemini_file(file_hash) if db_client else None
+    if name:
+        try:
+            file_obj = get_client().files.get(name=name)
+            if file_obj.state == types.FileState.ACTIVE:
+                logger.info("♻️ Reusing uploaded file.")
+                return file_obj
+        except Exception:
+            pass
+
+    if is_bytes:
+        file_obj = get_client().files.upload(
+            file=io.BytesIO(pdf), config=types.UploadFileConfig(mime_type="application/pdf")
+        )
+    else:
+        file_obj = get_client().files.upload(file=pdf)
+    if db_client:
+        db_client.put_gemini_file(file_hash, file_obj.name)
+    return file_obj
+
+
+def _rubric_pdf_content(pdf: Union[str, bytes]) -> Any:
+    """The rubric PDF as request content: inline bytes when small enough, else a (shared) upload."""
+    if isinstance(pdf, (bytes, bytearray)) and len(pdf) <= INLINE_PDF_MAX_BYTES:
+        return types.Part.from_bytes(data=bytes(pdf), mime_type="application/pdf")
+    return _upload_shared(pdf)
 
 
 # ============================================
@@ -55,37 +121,156 @@ if GEMINI_API_KEY:
 def list_rubric_sets() -> List[Dict[str, Any]]:
     """Fetch all rubric sets from DB."""
     if not db_client: return []
-    return list(db_client.rubric_sets_col.find({}, {'_id': 0}))
+    return list(db_client.rubric_sets_col.find({}, {'_id': 0, 'parsed_rubrics_prompt_json': 0}))
+
+# Rubric sets change rarely: keep their metadata in-process for a few minutes
+# instead of a Mongo read on every submission. Each entry is
+# (meta, rubrics_json, deadline), the second being the rubric set already
+# serialized for the grading prompt (stored on the set by upsert_rubric_set;
+# serialized here only for older sets) and the last the parsed UTC deadline,
+# so neither is rebuilt per student.
+RUBRIC_CACHE_TTL = 300
+_rubric_cache = TTLCache(maxsize=512, ttl=RUBRIC_CACHE_TTL)
+_rubric_cache_lock = threading.Lock()  # TTLCache itself is not thread-safe
+
+RubricEntry = Tuple[Dict[str, Any], str, Optional[datetime]]
+
+def _cached_rubric(rubric_set_id: str) -> Optional[RubricEntry]:
+    with _rubric_cache_lock:
+        return _rubric_cache.get(rubric_set_id)
+
+def _cache_rubric(rubric_set_id: str, meta: Optional[Dict[str, Any]]) -> Optional[RubricEntry]:
+    if meta is None:
+        return None
+    prompt_json = meta.get('parsed_rubrics_prompt_json') or rubrics_prompt_json(meta.get('parsed_rubrics') or [])
+    deadline = meta.get('deadline')
+    deadline_dt = datetime.fromisoformat(deadline).replace(tzinfo=timezone.utc) if deadline else None
+    entry = (meta, prompt_json, deadline_dt)
+    with _rubric_cache_lock:
+        _rubric_cache[rubric_set_id] = entry
+    return entry
+
+def _invalidate_rubric_meta(rubric_set_id: str) -> None:
+    with _rubric_cache_lock:
+        _rubric_cache.pop(rubric_set_id, None)
+
+def _rubric_entry(rubric_set_id: str) -> Optional[RubricEntry]:
+    return _cached_rubric(rubric_set_id) or _cache_rubric(rubric_set_id, db_client.get_rubric_meta(rubric_set_id))
+
+async def _arubric_entry(rubric_set_id: str) -> Optional[RubricEntry]:
+    return _cached_rubric(rubric_set_id) or _cache_rubric(rubric_set_id, await db_client.aget_rubric_meta(rubric_set_id))
 
 def get_rubric_meta(rubric_set_id: str) -> Optional[Dict[str, Any]]:
-    """Fetch metadata for a single rubric set."""
+    """Fetch metadata for a single rubric set (cached for RUBRIC_CACHE_TTL seconds)."""
     if not db_client: return None
-    return db_client.get_rubric_meta(rubric_set_id)
+    entry = _rubric_entry(rubric_set_id)
+    return entry[0] if entry else None
 
-def extract_and_save_rubric_from_pdf(pdf_path: str, teacher_id: Optional[str],
+async def aget_rubric_meta(rubric_set_id: str) -> Optional[Dict[str, Any]]:
+    """Async `get_rubric_meta`."""
+    if not db_client: return None
+    entry = await _arubric_entry(rubric_set_id)
+    return entry[0] if entry else None
+
+def get_rubric_metas(rubric_set_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Metadata for several rubric sets: cached ones directly, the rest in one $in query."""
+    if not db_client: return {}
+    metas: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for rid in dict.fromkeys(rubric_set_ids):
+        entry = _cached_rubric(rid)
+        if entry:
+            metas[rid] = entry[0]
+        else:
+            missing.append(rid)
+    if missing:
+        for rid, meta in db_client.get_rubric_metas(missing).items():
+            metas[rid] = _cache_rubric(rid, meta)[0]
+    return metas
+
+# Concurrent async lookups arriving within this window share one $in query
+RUBRIC_COALESCE_WINDOW = 0.005
+# Per event loop: rubric_set_id -> futures waiting for it
+_pending_rubric_reads = weakref.WeakKeyDictionary()
+# The loop only holds weak references to tasks; keep each flush alive until it is done
+_rubric_flush_tasks: Set[asyncio.Task] = set()
+
+async def aget_rubric_meta_batched(rubric_set_id: str) -> Optional[Dict[str, Any]]:
+    """
+    `aget_rubric_meta` for fan-out callers (e.g. one lookup per listed
+    submission): cache misses are gathered for RUBRIC_COALESCE_WINDOW seconds
+    and fetched together.
+    """
+    if not db_client: return None
+    entry = _cached_rubric(rubric_set_id)
+    if entry:
+        return entry[0]
+
+    loop = asyncio.get_running_loop()
+    pending = _pending_rubric_reads.get(loop)
+    if pending is None:
+        pending = _pending_rubric_reads[loop] = {}
+    if not pending:
+        loop.call_later(RUBRIC_COALESCE_WINDOW, _start_rubric_flush, loop)
+    fut = loop.create_future()
+    pending.setdefault(rubric_set_id, []).append(fut)
+    return await fut
+
+def _start_rubric_flush(loop: asyncio.AbstractEventLoop) -> None:
+    task = loop.create_task(_flush_rubric_reads(loop))
+    _rubric_flush_tasks.add(task)
+    task.add_done_callback(_rubric_flush_tasks.discard)
+
+async def _flush_rubric_reads(loop: asyncio.AbstractEventLoop) -> None:
+    pending = _pending_rubric_reads.pop(loop, {})
+    if not pending:
+        return
+    error: Exception = RuntimeError("Rubric metadata lookup did not complete")
+    try:
+        metas = await db_client.aget_rubric_metas(list(pending))
+        for rid, futs in pending.items():
+            try:
+                entry = _cache_rubric(rid, metas.get(rid))
+            except Exception as e:
+                # e.g. a malformed deadline on this set; the other sets still resolve
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(entry[0] if entry else None)
+    except Exception as e:
+        error = e
+    finally:
+        # Whatever happened (including cancellation), no waiter is left hanging
+        for futs in pending.values():
+            for fut in futs:
+                if not fut.done():
+                    fut.set_exception(error)
+
+def extract_and_save_rubric_from_pdf(pdf: Union[str, bytes], teacher_id: Optional[str],
                                      deadline_iso: Optional[str], 
                                      max_attempts: Optional[int]) -> Dict[str, Any]:
     """
     Uses core `evaluator.py` logic to extract rubrics and `database.py` to save.
+    `pdf` is a file path or the PDF bytes themselves (e.g. a Streamlit upload),
+    so callers holding the bytes need no temp file.
     """
     try:
-        # 1. Upload file to Gemini (needed for extraction)
-        print(f"📤 Uploading rubric: {pdf_path}")
-        file_obj = genai.upload_file(pdf_path)
+        # 1. Hand the file to Gemini (needed for extraction)
+        logger.info("📤 Sending rubric: %s", f"{len(pdf)} bytes" if isinstance(pdf, (bytes, bytearray)) else pdf)
+        file_obj = _rubric_pdf_content(pdf)
         
-        # 2. Extract using CORE logic
-        print("🧠 Extracting rubrics...")
+        # 2. Extract using CORE logic (an upload is kept for reuse, see _upload_shared)
+        logger.info("🧠 Extracting rubrics...")
         parsed_rubrics = extract_rubrics_from_file(file_obj)
         
-        # 3. Cleanup
-        try: genai.delete_file(file_obj.name)
-        except: pass
-        
         if not parsed_rubrics:
             return {"error": "Failed to extract rubrics from PDF"}
 
         # Validate rubrics
-        print("🕵️ Validating rubrics...")
+        logger.info("🕵️ Validating rubrics...")
         validation_result = validate_rubrics_with_llm(parsed_rubrics)
 
         # 4. Compute ID using CORE logic
@@ -96,14 +281,9 @@ def extract_and_save_rubric_from_pdf(pdf_path: str, teacher_id: Optional[str],
         
         # 6. Save to DB
         if db_client:
-            db_client.upsert_rubric_set(rubric_set_id, parsed_rubrics, deadline_dt, max_attempts)
-            
-            # Link to teacher
-            if teacher_id:
-                db_client.rubric_sets_col.update_one(
-                    {"rubric_set_id": rubric_set_id},
-                    {"$set": {"teacher_id": teacher_id}}
-                )
+            # Also links the set to its teacher, in the same write
+            db_client.upsert_rubric_set(rubric_set_id, parsed_rubrics, deadline_dt, max_attempts, teacher_id)
+            _invalidate_rubric_meta(rubric_set_id)
                 
         return {
             "ok": True,
@@ -113,8 +293,7 @@ def extract_and_save_rubric_from_pdf(pdf_path: str, teacher_id: Optional[str],
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Rubric processing failed")
         return {"error": str(e)}
 
 # ============================================
@@ -131,15 +310,127 @@ def get_student_submission_record(student_id: str, rubric_set_id: str) -> Option
         return None
     return db_client.get_submission_record(student_id, rubric_set_id)
 
+async def aget_student_submission_record(student_id: str, rubric_set_id: str) -> Optional[Dict[str, Any]]:
+    """Async `get_student_submission_record`."""
+    if not db_client:
+        return None
+    return await db_client.aget_submission_record(student_id, rubric_set_id)
+
+# List views skip the stored rubric copy; the student view only needs its length
+_STUDENT_LIST_PROJECTION = {
+    '_id': 0, 'student_id': 1, 'rubric_set_id': 1, 'timestamp': 1, 'attempt_number': 1,
+    'filename': 1, 'result': 1, 'rubric_count': {'$size': {'$ifNull': ['$rubrics', []]}},
+}
+# Index created in MongoDBClient._ensure_indexes; hinted so the sort never falls back to a scan
+_STUDENT_TIMESTAMP_INDEX = [("student_id", 1), ("timestamp", -1)]
+# Headline columns only, all present in this index: a covered query that never loads a document
+_STUDENT_SUMMARY_PROJECTION = {
+    '_id': 0, 'rubric_set_id': 1, 'timestamp': 1, 'attempt_number': 1, 'result.total_score': 1,
+}
+_STUDENT_SUMMARY_INDEX = [
+    ("student_id", 1), ("timestamp", -1), ("rubric_set_id", 1), ("attempt_number", 1), ("result.total_score", 1),
+]
+_RUBRIC_LIST_PROJECTION = {
+    '_id': 0, 'student_id': 1, 'rubric_set_id': 1, 'timestamp': 1, 'attempt_number': 1,
+    'filename': 1, 'result.total_score': 1,
+}
+
 def list_submissions_for_student(student_id: str) -> List[Dict[str, Any]]:
     """List all submissions for a student."""
     if not db_client: return []
-    return list(db_client.submissions_col.find({"student_id": student_id}, {'_id': 0}).sort("timestamp", -1))
+    return list(
+        db_client.submissions_col.find({"student_id": student_id}, _STUDENT_LIST_PROJECTION)
+        .sort("timestamp", -1).hint(_STUDENT_TIMESTAMP_INDEX)
+    )
 
-def list_submissions_for_rubric(rubric_set_id: str) -> List[Dict[str, Any]]:
-    """List all submissions for a rubric."""
+async def alist_submissions_for_student(student_id: str) -> List[Dict[str, Any]]:
+    """Async `list_submissions_for_student`."""
     if not db_client: return []
-    return list(db_client.submissions_col.find({"rubric_set_id": rubric_set_id}, {'_id': 0}))
+    col = db_client.async_submissions_col
+    if col is None:
+        return await asyncio.to_thread(list_submissions_for_student, student_id)
+    return await (
+        col.find({"student_id": student_id}, _STUDENT_LIST_PROJECTION)
+        .sort("timestamp", -1).hint(_STUDENT_TIMESTAMP_INDEX).to_list(None)
+    )
+
+def list_submission_summaries_for_student(student_id: str) -> List[Dict[str, Any]]:
+    """
+    A student's submissions, newest first, reduced to rubric, time, attempt and
+    total score. Unlike `list_submissions_for_student` it carries no feedback,
+    and Mongo answers it from the index without fetching any document.
+    """
+    if not db_client: return []
+    return list(
+        db_client.submissions_col.find({"student_id": student_id}, _STUDENT_SUMMARY_PROJECTION)
+        .sort("timestamp", -1).hint(_STUDENT_SUMMARY_INDEX)
+    )
+
+async def alist_submission_summaries_for_student(student_id: str) -> List[Dict[str, Any]]:
+    """Async `list_submission_summaries_for_student`."""
+    if not db_client: return []
+    col = db_client.async_submissions_col
+    if col is None:
+        return await asyncio.to_thread(list_submission_summaries_for_student, student_id)
+    return await (
+        col.find({"student_id": student_id}, _STUDENT_SUMMARY_PROJECTION)
+        .sort("timestamp", -1).hint(_STUDENT_SUMMARY_INDEX).to_list(None)
+    )
+
+# getMore batch size for submission cursors (the driver default is 101 docs)
+SUBMISSION_CURSOR_BATCH = 200
+
+def _rubric_submissions_cursor(col, rubric_set_id: str, page: int, page_size: Optional[int]):
+    cursor = (
+        col.find({"rubric_set_id": rubric_set_id}, _RUBRIC_LIST_PROJECTION)
+        .sort("timestamp", -1)
+        .batch_size(SUBMISSION_CURSOR_BATCH)
+    )
+    if page_size:
+        cursor = cursor.skip(page * page_size).limit(page_size)
+    return cursor
+
+def iter_submissions_for_rubric(rubric_set_id: str) -> Iterator[Dict[str, Any]]:
+    """Yields a rubric's submissions (newest first) as the cursor fetches them."""
+    if not db_client: return
+    yield from _rubric_submissions_cursor(db_client.submissions_col, rubric_set_id, 0, None)
+
+def list_submissions_for_rubric(rubric_set_id: str, page: int = 0,
+                                page_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    List submissions for a rubric (summary fields and total score only),
+    newest first. With `page_size`, returns only that page.
+    """
+    if not db_client: return []
+    return list(_rubric_submissions_cursor(db_client.submissions_col, rubric_set_id, page, page_size))
+
+async def alist_submissions_for_rubric(rubric_set_id: str, page: int = 0,
+                                       page_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Async `list_submissions_for_rubric`."""
+    if not db_client: return []
+    col = db_client.async_submissions_col
+    if col is None:
+        return await asyncio.to_thread(list_submissions_for_rubric, rubric_set_id, page, page_size)
+    return await _rubric_submissions_cursor(col, rubric_set_id, page, page_size).to_list(None)
+
+def get_submission_detail(student_id: str, rubric_set_id: str) -> Optional[Dict[str, Any]]:
+    """Full submission document (rubrics and result) for a drill-down view."""
+    if not db_client: return None
+    return db_client.submissions_col.find_one(
+        {"student_id": student_id, "rubric_set_id": rubric_set_id}, {'_id': 0}
+    )
+
+def _submission_blocked(entry: RubricEntry, record: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Returns why a new attempt is not allowed (deadline / attempts), or None."""
+    rubric_meta, _, deadline = entry
+    if deadline and now_utc() > deadline:
+        return "Submission deadline has passed"
+
+    max_attempts = rubric_meta.get('max_attempts')
+    used_attempts = record.get('attempt_number', 0) if record else 0
+    if max_attempts and used_attempts >= max_attempts:
+        return f"Max attempts ({max_attempts}) reached"
+    return None
 
 def grade_student_submission(student_id: str, report_file_path: str, rubric_set_id: str) -> Dict[str, Any]:
     """
@@ -149,37 +440,29 @@ def grade_student_submission(student_id: str, report_file_path: str, rubric_set_
 
     try:
         # 1. Get Rubric Metadata
-        rubric_meta = db_client.get_rubric_meta(rubric_set_id)
-        if not rubric_meta: return {"error": "Rubric not found"}
+        entry = _rubric_entry(rubric_set_id)
+        if not entry: return {"error": "Rubric not found"}
+        rubric_meta, rubrics_json, _ = entry
         
         parsed_rubrics = rubric_meta.get('parsed_rubrics')
         
         # 2. Check Constraints (Deadline & Attempts)
-        if rubric_meta.get('deadline'):
-            deadline = datetime.fromisoformat(rubric_meta['deadline']).replace(tzinfo=timezone.utc)
-            if now_utc() > deadline:
-                return {"error": "Submission deadline has passed"}
-
-        max_attempts = rubric_meta.get('max_attempts')
         record = db_client.get_submission_record(student_id, rubric_set_id)
-        used_attempts = record.get('attempt_number', 0) if record else 0
-        
-        if max_attempts and used_attempts >= max_attempts:
-            return {"error": f"Max attempts ({max_attempts}) reached"}
+        blocked = _submission_blocked(entry, record)
+        if blocked:
+            return {"error": blocked}
 
         # 3. Grade using CORE logic
-        print(f"🧠 Grading submission for {student_id}...")
+        logger.info("🧠 Grading submission for %s...", student_id)
         # Note: grade_submission expects a file path, not file object, based on your main.py usage
-        parsed_result = grade_submission(report_file_path, parsed_rubrics, GRADE_MODEL)
+        parsed_result = grade_submission(report_file_path, parsed_rubrics, GRADE_MODEL, rubrics_json)
         
-        # 4. Save to DB
-        new_attempt = used_attempts + 1
+        # 4. Save to DB (the attempt number is bumped atomically and set on parsed_result)
         parsed_result["_timestamp"] = now_utc().isoformat()
-        parsed_result["_attempt_number"] = new_attempt
         
         mongo_op = db_client.upsert_submission(
             student_id, rubric_set_id, report_file_path,
-            parsed_rubrics, parsed_result, new_attempt
+            parsed_rubrics, parsed_result
         )
         
         return {
@@ -189,10 +472,165 @@ def grade_student_submission(student_id: str, report_file_path: str, rubric_set_
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Grading failed")
+        return {"error": f"Grading failed: {str(e)}"}
+
+def grade_many(student_ids: List[str], report_file_paths: List[str], rubric_set_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Grades several students' reports against one rubric (e.g. a batch regrade).
+    Rubric metadata and attempt records are read once, reports are graded
+    concurrently, and all results are saved in a single bulk write.
+
+    Returns {student_id: {"result": ...}} or {student_id: {"error": ...}}.
+    """
+    if not db_client:
+        return {sid: {"error": "Database not connected"} for sid in student_ids}
+
+    entry = _rubric_entry(rubric_set_id)
+    if not entry:
+        return {sid: {"error": "Rubric not found"} for sid in student_ids}
+    rubric_meta, rubrics_json, _ = entry
+    parsed_rubrics = rubric_meta.get('parsed_rubrics')
+
+    records = db_client.get_submission_records(student_ids, rubric_set_id)
+    results: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+    for sid, path in zip(student_ids, report_file_paths):
+        blocked = _submission_blocked(entry, records.get(sid))
+        if blocked:
+            results[sid] = {"error": blocked}
+        else:
+            jobs.append((sid, path))
+
+    logger.info("🧠 Grading %d submissions...", len(jobs))
+    with ThreadPoolExecutor(max_workers=GEMINI_CONCURRENCY) as ex:
+        futures = [(sid, path, ex.submit(grade_submission, path, parsed_rubrics, GRADE_MODEL, rubrics_json)) for sid, path in jobs]
+
+    entries = []
+    for sid, path, fut in futures:
+        try:
+            parsed_result = fut.result()
+        except (Exception, SystemExit) as e:  # SystemExit: unreadable PDF
+            results[sid] = {"error": f"Grading failed: {str(e)}"}
+            continue
+        record = records.get(sid)
+        # Expected attempt for the caller; the stored one is incremented server-side
+        new_attempt = (record.get('attempt_number', 0) if record else 0) + 1
+        parsed_result["_timestamp"] = now_utc().isoformat()
+        parsed_result["_attempt_number"] = new_attempt
+        entries.append((sid, rubric_set_id, path, parsed_rubrics, parsed_result))
+        results[sid] = {"result": parsed_result}
+
+    try:
+        db_client.bulk_upsert_submissions(entries)
+    except Exception as e:
+        for entry in entries:
+            results[entry[0]] = {"error": f"Saving results failed: {str(e)}"}
+
+    return results
+
+async def agrade_student_submission(student_id: str, report_file_path: str, rubric_set_id: str) -> Dict[str, Any]:
+    """
+    Async `grade_student_submission`: Mongo round-trips go through Motor and the
+    blocking Gemini grading runs in a worker thread, so the event loop can serve
+    other submissions meanwhile.
+    """
+    if not db_client: return {"error": "Database not connected"}
+
+    try:
+        entry, record = await asyncio.gather(
+            _arubric_entry(rubric_set_id),
+            db_client.aget_submission_record(student_id, rubric_set_id),
+        )
+        if not entry: return {"error": "Rubric not found"}
+        rubric_meta, rubrics_json, _ = entry
+
+        parsed_rubrics = rubric_meta.get('parsed_rubrics')
+
+        blocked = _submission_blocked(entry, record)
+        if blocked:
+            return {"error": blocked}
+
+        logger.info("🧠 Grading submission for %s...", student_id)
+        parsed_result = await asyncio.to_thread(grade_submission, report_file_path, parsed_rubrics, GRADE_MODEL, rubrics_json)
+
+        parsed_result["_timestamp"] = now_utc().isoformat()
+
+        mongo_op = await db_client.aupsert_submission(
+            student_id, rubric_set_id, report_file_path,
+            parsed_rubrics, parsed_result
+        )
+
+        return {
+            "result": parsed_result,
+            "mongo_op": mongo_op,
+            "meta": rubric_meta
+        }
+
+    except Exception as e:
+        logger.exception("Grading failed")
         return {"error": f"Grading failed: {str(e)}"}
 
+async def agrade_many(student_ids: List[str], report_file_paths: List[str], rubric_set_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Async `grade_many`: the rubric and attempt reads are awaited together, at
+    most GEMINI_CONCURRENCY reports are graded at once in worker threads, and
+    the results are saved in one bulk write.
+    """
+    if not db_client:
+        return {sid: {"error": "Database not connected"} for sid in student_ids}
+
+    entry, records = await asyncio.gather(
+        _arubric_entry(rubric_set_id),
+        db_client.aget_submission_records(student_ids, rubric_set_id),
+    )
+    if not entry:
+        return {sid: {"error": "Rubric not found"} for sid in student_ids}
+    rubric_meta, rubrics_json, _ = entry
+    parsed_rubrics = rubric_meta.get('parsed_rubrics')
+
+    results: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+    for sid, path in zip(student_ids, report_file_paths):
+        blocked = _submission_blocked(entry, records.get(sid))
+        if blocked:
+            results[sid] = {"error": blocked}
+        else:
+            jobs.append((sid, path))
+
+    slots = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+    async def _grade(path: str) -> Dict[str, Any]:
+        async with slots:
+            try:
+                return await asyncio.to_thread(grade_submission, path, parsed_rubrics, GRADE_MODEL, rubrics_json)
+            except SystemExit as e:  # unreadable PDF; must not escape into the event loop
+                raise RuntimeError(str(e)) from None
+
+    logger.info("🧠 Grading %d submissions...", len(jobs))
+    outcomes = await asyncio.gather(*(_grade(path) for _, path in jobs), return_exceptions=True)
+
+    entries = []
+    for (sid, path), parsed_result in zip(jobs, outcomes):
+        if isinstance(parsed_result, Exception):
+            results[sid] = {"error": f"Grading failed: {str(parsed_result)}"}
+            continue
+        record = records.get(sid)
+        # Expected attempt for the caller; the stored one is incremented server-side
+        new_attempt = (record.get('attempt_number', 0) if record else 0) + 1
+        parsed_result["_timestamp"] = now_utc().isoformat()
+        parsed_result["_attempt_number"] = new_attempt
+        entries.append((sid, rubric_set_id, path, parsed_rubrics, parsed_result))
+        results[sid] = {"result": parsed_result}
+
+    try:
+        await db_client.abulk_upsert_submissions(entries)
+    except Exception as e:
+        for entry in entries:
+            results[entry[0]] = {"error": f"Saving results failed: {str(e)}"}
+
+    return results
+
 # ============================================
 # BLUEBOOK EXTRACTION
 # ============================================
@@ -202,7 +640,7 @@ def extract_bluebook(image_paths: Union[str, List[str]]) -> Dict[str, Any]:
     Uses core `bluebook_extractor.py` logic.
     """
     try:
-        print(f"🧠 Extracting bluebook(s): {image_paths}")
+        logger.info("🧠 Extracting bluebook(s): %s", image_paths)
         # Directly call the core logic function
         result = extract_bluebook_data(image_paths)
         
@@ -221,18 +659,31 @@ def extract_bluebook(image_paths: Union[str, List[str]]) -> Dict[str, Any]:
     except Exception as e:
         return {"error": str(e)}
 
-def save_bluebook_results(teacher_id: str, data: Dict[str, Any], filename: str) -> bool:
-    """Save bluebook results to DB."""
+def save_bluebook_results(teacher_id: str, data: Union[Dict[str, Any], List[Dict[str, Any]]],
+                          filename: Union[str, List[str]]) -> bool:
+    """
+    Save bluebook results to DB. Lists of results and filenames (pairwise) are
+    saved with one unordered insert_many.
+    """
     if not db_client: return False
-    try:
-        doc = {
+    items = zip(data, filename) if isinstance(data, list) else [(data, filename)]
+    extraction_date = now_utc().isoformat()
+    docs = [
+        {
             "teacher_id": teacher_id,
-            "image_filename": filename,
-            "extraction_date": now_utc().isoformat(),
-            "bluebooks": data.get("bluebooks", []),
-            "visualized_images": data.get("visualized_images", [])
+            "image_filename": fname,
+            "extraction_date": extraction_date,
+            "bluebooks": item.get("bluebooks", []),
+            "visualized_images": item.get("visualized_images", [])
         }
-        db_client.db["bluebook_results"].insert_one(doc)
+        for item, fname in items
+    ]
+    if not docs: return True
+    try:
+        if len(docs) == 1:
+            db_client.bluebook_results_col.insert_one(docs[0])
+        else:
+            db_client.bluebook_results_col.insert_many(docs, ordered=False)
         return True
     except Exception:
         return False
@@ -240,12 +691,17 @@ def save_bluebook_results(teacher_id: str, data: Dict[str, Any], filename: str)
 def get_bluebook_history(teacher_id: str) -> List[Dict[str, Any]]:
     """Fetch bluebook history."""
     if not db_client: return []
-    return list(db_client.db["bluebook_results"].find({"teacher_id": teacher_id}).sort("extraction_date", -1))
+    return list(db_client.bluebook_results_col.find(
+        {"teacher_id": teacher_id}, {"visualized_images": 0}
+    ).sort("extraction_date", -1))
 
 # ============================================
 # AUTHENTICATION (Direct DB calls)
 # ============================================
 
+# Teacher IDs are derived from the name: runs of anything but [a-z0-9] become "_"
+_TEACHER_ID_RE = re.compile(r'[^a-z0-9]+')
+
 def login_student(student_id: str, password: str) -> bool:
     return db_client.verify_student_password(student_id, password) if db_client else False
 
@@ -257,12 +713,29 @@ def register_student(student_id: str, name: str, password: str) -> bool:
 
 def register_teacher(name: str, password: str) -> Optional[str]:
     if not db_client: return None
-    base = re.sub(r'[^a-z0-9]+', '_', name.strip().lower())
+    base = _TEACHER_ID_RE.sub('_', name.strip().lower())
     teacher_id = f"t_{base[:20]}_{secrets.token_hex(2)}"
     if db_client.create_teacher(teacher_id, name, password):
         return teacher_id
     return None
 
+async def alogin_student(student_id: str, password: str) -> bool:
+    return await db_client.averify_student_password(student_id, password) if db_client else False
+
+async def alogin_teacher(teacher_id: str, password: str) -> bool:
+    return await db_client.averify_teacher_password(teacher_id, password) if db_client else False
+
+async def aregister_student(student_id: str, name: str, password: str) -> bool:
+    return await db_client.acreate_student(student_id, name, password) if db_client else False
+
+async def aregister_teacher(name: str, password: str) -> Optional[str]:
+    if not db_client: return None
+    base = _TEACHER_ID_RE.sub('_', name.strip().lower())
+    teacher_id = f"t_{base[:20]}_{secrets.token_hex(2)}"
+    if await db_client.acreate_teacher(teacher_id, name, password):
+        return teacher_id
+    return None
+
 def get_student_info(student_id: str):
     return db_client.get_student(student_id) if db_client else None
 
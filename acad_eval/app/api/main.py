@@ -1,26 +1,27 @@
 # main.py - The execution and orchestration file.
 
-import os, re, json, sys
+import os, re, sys
 from getpass import getpass
 from datetime import datetime, timezone, timedelta
 # REMOVED: from google.colab import files
-import google.generativeai as genai
 
 # --- Imports from other modules ---
 # Assuming 'app' is the root level for imports when running in a structured environment
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from app.core.config import GEMINI_API_KEY, RUBRIC_MODEL, GRADE_MODEL, get_ist_timezone, now_utc
+from app.core.config import RUBRIC_MODEL, GRADE_MODEL, get_ist_timezone, now_utc
 from app.core.database import db_client
 from ai_models.llm_evaluation.evaluator import (
     extract_rubrics_from_file, compute_rubric_set_id, grade_submission, validate_rubrics_with_llm
 )
 from ai_models.llm_evaluation.bluebook_extractor import extract_bluebook_data
+from ai_models.llm_evaluation._client import get_client
+from ai_models.llm_evaluation._common import json_pretty
 
 
 # --- Initialize Gemini Client ---
 try:
-    genai.configure(api_key=GEMINI_API_KEY)
+    gemini_client = get_client()
 except Exception:
     raise SystemExit("❌ Failed to configure Gemini API.")
 
@@ -64,7 +65,7 @@ def teacher_setup_rubric():
 
     # Upload your PDF to Gemini for parsing
     print("⬆️ Temporarily uploading rubric file to Gemini...")
-    file_obj = genai.upload_file(rubric_filename)
+    file_obj = gemini_client.files.upload(file=rubric_filename)
 
     # Get deadline input (in IST)
     deadline_input = input("\n⏰ Enter submission deadline (YYYY-MM-DD HH:MM in IST) or leave blank: ").strip()
@@ -78,7 +79,7 @@ def teacher_setup_rubric():
             DEADLINE = deadline_ist.astimezone(timezone.utc)  # Convert to UTC
         except Exception as e:
             print("❌ Error parsing datetime:", str(e))
-            genai.delete_file(file_obj.name)
+            gemini_client.files.delete(name=file_obj.name)
             raise SystemExit("Invalid format. Use YYYY-MM-DD HH:MM (e.g., 2025-12-01 23:59)")
 
     # Get max attempts input
@@ -93,11 +94,11 @@ def teacher_setup_rubric():
     # Validate rubrics
     print("\n🕵️ Validating rubrics...")
     validation_result = validate_rubrics_with_llm(parsed_rubrics)
-    print(json.dumps(validation_result, indent=2))
+    print(json_pretty(validation_result))
 
     # Clean up uploaded file from Gemini
     try:
-        genai.delete_file(file_obj.name)
+        gemini_client.files.delete(name=file_obj.name)
     except Exception:
         pass
 
@@ -161,7 +162,7 @@ def teacher_extract_bluebook():
         print("\n✅ Extraction Complete!")
         print("=" * 30)
         # Pretty print the JSON result
-        print(json.dumps(extraction_result, indent=2))
+        print(json_pretty(extraction_result))
         print("=" * 30)
 
     except FileNotFoundError as e:
@@ -244,14 +245,13 @@ def student_grade_submission():
     print("\n🧠 Starting Gemini Grading...")
     parsed_result = grade_submission(fname, parsed_rubrics, GRADE_MODEL)
 
-    # Update submission record
-    new_attempt_number = used_attempts + 1
+    # Update submission record (bumps the attempt number and sets parsed_result["_attempt_number"])
     parsed_result["_timestamp"] = now.isoformat()
-    parsed_result["_attempt_number"] = new_attempt_number
 
     mongo_op = db_client.upsert_submission(
-        student_id, rubric_set_id, fname, parsed_rubrics, parsed_result, new_attempt_number
+        student_id, rubric_set_id, fname, parsed_rubrics, parsed_result
     )
+    new_attempt_number = parsed_result["_attempt_number"]
 
     # Display summary
     print("\n✅ Evaluation Complete!")
@@ -266,7 +266,7 @@ def student_grade_submission():
     print(f"   • MongoDB Operation: {mongo_op}")
 
     print("\n📊 Detailed Rubric Feedback:\n")
-    print(json.dumps(parsed_result, indent=2, ensure_ascii=False))
+    print(json_pretty(parsed_result))
 
 
 # =========================
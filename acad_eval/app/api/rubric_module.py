@@ -1,70 +1,112 @@
 # rubric_extraction.py
+"""
+Extracts rubric criteria from rubric PDFs with Gemini.
+
+    python rubric_module.py --pdf rubric.pdf [--deadline "YYYY-MM-DD HH:MM"] [--max-attempts N]
+
+Several --pdf arguments are processed concurrently. The API key is read from
+GEMINI_API_KEY / GOOGLE_API_KEY, so runs need no interactive input.
+"""
+import argparse
+import asyncio
 import os
 import sys
-import tkinter as tk
-from tkinter import filedialog
-from datetime import datetime, timezone, timedelta
-from google import genai
+from datetime import datetime, timezone
+from typing import List, Optional
 from google.genai import types
 
-# Import the wrapper we just made
-from ai_wrapper import GeminiLC
+# Make `ai_models` importable when this file is run directly as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ai_models.llm_evaluation.ai_wrapper import GeminiLC
+from ai_models.llm_evaluation._client import get_client
+from ai_models.llm_evaluation._common import sha256_file
+from ai_models.llm_evaluation._retry import _is_transient
+from app.core.config import GEMINI_API_KEY, RUBRIC_MODEL, IST
+from app.core.database import db_client, GEMINI_CACHE_TTL_SECONDS
 
-# --- CONFIGURATION ---
-# Ensure your key is set
-if "GOOGLE_API_KEY" not in os.environ:
-    os.environ["GOOGLE_API_KEY"] = input("🔑 Enter your Google API Key: ").strip()
+# The Gemini client is fetched inside each call (get_client() is shared and
+# lazy): creating it at import time fails without a key, before the CLI's
+# "Set GEMINI_API_KEY" check can run.
 
-client = genai.Client(api_key=os.environ["GOOGLE_API_KEY"])
+async def _rubric_cache_name(rubric_path: str, file_hash: str, reuse: bool = True):
+    """
+    Name of a Gemini context cache holding the rubric PDF, shared across runs
+    through Mongo, so an unchanged PDF is neither re-uploaded nor re-prefilled.
+    Returns (cache_name, file_obj): cache_name is None when the PDF cannot be
+    cached (e.g. below the model's minimum token count), and file_obj is None
+    on a cache hit, where no upload is needed. reuse=False skips the shared
+    lookup and always uploads.
+    """
+    cache_name = db_client.get_gemini_cache(file_hash, RUBRIC_MODEL) if db_client and reuse else None
+    if cache_name:
+        print("♻️ Reusing cached rubric PDF.")
+        return cache_name, None
 
-def select_file_locally():
-    """Opens a dialog to select the PDF (replaces files.upload)"""
-    root = tk.Tk()
-    root.withdraw()
-    root.attributes('-topmost', True)
-    file_path = filedialog.askopenfilename(
-        title="Select Rubric PDF",
-        filetypes=[("PDF Files", "*.pdf"), ("All Files", "*.*")]
+    client = get_client()
+    print("⬆️ Uploading to Gemini...")
+    file_obj = await client.aio.files.upload(file=rubric_path)
+    try:
+        cache_name = (await client.aio.caches.create(
+            model=RUBRIC_MODEL,
+            config=types.CreateCachedContentConfig(contents=[file_obj], ttl=f"{GEMINI_CACHE_TTL_SECONDS}s"),
+        )).name
+    except Exception as e:
+        print(f"⚠️ Could not cache the rubric PDF ({e}); sending it inline.")
+        return None, file_obj
+    if db_client:
+        db_client.put_gemini_cache(file_hash, RUBRIC_MODEL, cache_name)
+    return cache_name, file_obj
+
+async def _generate_rubrics(prompt: str, cache_name: Optional[str], file_obj):
+    """Rubric extraction call, against the cached PDF when there is one."""
+    client = get_client()
+    if cache_name:
+        return await client.aio.models.generate_content(
+            model=RUBRIC_MODEL,
+            contents=[prompt],
+            config=types.GenerateContentConfig(response_mime_type="application/json", cached_content=cache_name)
+        )
+    return await client.aio.models.generate_content(
+        model=RUBRIC_MODEL,
+        contents=[file_obj, prompt],
+        config=types.GenerateContentConfig(response_mime_type="application/json")
     )
-    root.destroy()
-    return file_path
 
-def main():
+def _parse_deadline(deadline_input: Optional[str]) -> Optional[datetime]:
+    """UTC deadline from "YYYY-MM-DD HH:MM" (IST unless an offset is given), or None."""
+    if not deadline_input:
+        return None
+    try:
+        deadline_ist = datetime.fromisoformat(deadline_input)
+        if deadline_ist.tzinfo is None:
+            # Treat as IST
+            deadline_ist = deadline_ist.replace(tzinfo=IST)
+        return deadline_ist.astimezone(timezone.utc)
+    except Exception as e:
+        print("❌ Error parsing datetime:", str(e))
+        raise SystemExit("Invalid format.")
+
+async def main(rubric_path: str, deadline: Optional[str] = None, max_attempts: Optional[int] = None) -> str:
+    """Extracts the rubrics of one PDF and returns the raw JSON text."""
     # 1. 📂 Upload Rubric
-    print("📄 Please select your rubric PDF file...")
-    rubric_path = select_file_locally()
-    
-    if not rubric_path:
-        raise SystemExit("❌ No rubric file selected.")
+    if not rubric_path or not os.path.isfile(rubric_path):
+        raise SystemExit(f"❌ Rubric file not found: {rubric_path}")
 
     print(f"✅ Selected rubric file: {rubric_path}")
 
-    # Upload to Gemini (V2 Syntax)
-    print("⬆️ Uploading to Gemini...")
-    file_obj = client.files.upload(path=rubric_path)
-
-    # 2. 🕒 User Inputs (Deadline & Attempts)
-    deadline_input = input("\n⏰ Enter submission deadline (YYYY-MM-DD HH:MM in IST) or leave blank: ").strip()
-
-    DEADLINE = None
-    if deadline_input:
-        try:
-            deadline_ist = datetime.fromisoformat(deadline_input)
-            if deadline_ist.tzinfo is None:
-                # Treat as IST
-                deadline_ist = deadline_ist.replace(tzinfo=timezone(timedelta(hours=5, minutes=30)))
-            DEADLINE = deadline_ist.astimezone(timezone.utc)
-        except Exception as e:
-            print("❌ Error parsing datetime:", str(e))
-            raise SystemExit("Invalid format.")
-
-    max_attempts_input = input("🔁 Enter max attempts (integer) or leave blank for unlimited: ").strip()
-    MAX_ATTEMPTS = int(max_attempts_input) if max_attempts_input.isdigit() else None
+    # 2. 🕒 Deadline & Attempts (validated before any Gemini call)
+    DEADLINE = _parse_deadline(deadline)
+    MAX_ATTEMPTS = max_attempts if max_attempts and max_attempts > 0 else None
+
+    # Upload to Gemini (V2 Syntax), unless this exact PDF is already cached
+    file_hash = sha256_file(rubric_path)
+    cache_name, file_obj = await _rubric_cache_name(rubric_path, file_hash)
 
     # 3. ✅ Summary
     print("\n✅ Deadline and attempt settings recorded.")
     if DEADLINE:
-        DEADLINE_IST = DEADLINE.astimezone(timezone(timedelta(hours=5, minutes=30)))
+        DEADLINE_IST = DEADLINE.astimezone(IST)
         print(f"  • Deadline (IST): {DEADLINE_IST.strftime('%Y-%m-%d %H:%M:%S %Z')}")
     else:
         print("  • Deadline: None (unlimited time)")
@@ -82,22 +124,42 @@ def main():
     """
 
     print("\n🧠 Extracting rubrics...")
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[file_obj, prompt],
-        config=types.GenerateContentConfig(response_mime_type="application/json")
-    )
+    try:
+        response = await _generate_rubrics(prompt, cache_name, file_obj)
+    except Exception as e:
+        if not cache_name or _is_transient(e):
+            raise
+        # The shared cache can be gone on Gemini's side (deleted, or its TTL raced this run)
+        print(f"⚠️ Cached rubric PDF unusable ({e}); uploading it again.")
+        if db_client:
+            db_client.delete_gemini_cache(file_hash, RUBRIC_MODEL)
+        cache_name, file_obj = await _rubric_cache_name(rubric_path, file_hash, reuse=False)
+        response = await _generate_rubrics(prompt, cache_name, file_obj)
 
     print("\n✅ Rubrics extracted successfully!\n")
     print(response.text)
+    return response.text
+
+async def process_many(paths: List[str], deadline: Optional[str] = None,
+                       max_attempts: Optional[int] = None) -> List[str]:
+    """Runs `main` over several rubric PDFs concurrently, in input order."""
+    return await asyncio.gather(*(main(p, deadline, max_attempts) for p in paths))
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Extract rubric criteria from rubric PDFs with Gemini.")
+    ap.add_argument("--pdf", action="append", required=True,
+                    help="Rubric PDF to process (repeat for several)")
+    ap.add_argument("--deadline", help="Submission deadline, YYYY-MM-DD HH:MM in IST")
+    ap.add_argument("--max-attempts", type=int, help="Max attempts per student (omit for unlimited)")
+    return ap.parse_args(argv)
 
-    # 5. ✨ Initialize LangChain Wrapper
+if __name__ == "__main__":
+    args = _parse_args()
+    if not (GEMINI_API_KEY or os.environ.get("GOOGLE_API_KEY")):
+        raise SystemExit("❌ Set GEMINI_API_KEY (or GOOGLE_API_KEY) before running.")
+    asyncio.run(process_many(args.pdf, args.deadline, args.max_attempts))
+
+    # ✨ Initialize LangChain Wrapper
     print("\n✨ Initializing LangChain wrapper...")
     lc_gemini = GeminiLC()
     print("✅ LangChain wrapper ready: lc_gemini")
-    
-    # Optional: Test the wrapper
-    # print(lc_gemini("Hello, are you ready?"))
-
-if __name__ == "__main__":
-    main()
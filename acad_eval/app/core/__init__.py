@@ -0,0 +1,13 @@
+"""
+Core configuration and database access.
+
+`db_client` is re-exported lazily: importing `app.core.config` alone must not
+open a MongoDB connection.
+"""
+
+
+def __getattr__(name):
+    if name == "db_client":
+        from app.core.database import db_client
+        return db_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -42,9 +42,11 @@ RUBRIC_SETS_COLLECTION = "rubric_sets"
 
 # --- Utility Functions ---
 
+IST = timezone(timedelta(hours=5, minutes=30))
+
 def get_ist_timezone():
     """Returns the IST timezone object (UTC+5:30)."""
-    return timezone(timedelta(hours=5, minutes=30))
+    return IST
 
 def now_utc():
     """Returns the current UTC datetime."""
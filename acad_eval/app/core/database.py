@@ -2,13 +2,131 @@
 Database Module - MongoDB operations for the Academic Evaluation System
 """
 
+import asyncio
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import pymongo
-from pymongo import MongoClient
-from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from pymongo import IndexModel, MongoClient, ReturnDocument, UpdateOne
+from pymongo.write_concern import WriteConcern
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Tuple, Union
 import bcrypt
+from bson import Binary
+from cachetools import TTLCache
 
 from app.core.config import MONGO_URI, DATABASE_NAME, SUBMISSIONS_COLLECTION, RUBRIC_SETS_COLLECTION
+from ai_models.llm_evaluation._common import rubrics_prompt_json
+
+# Grading saves are idempotent on (student_id, rubric_set_id) and can be redone,
+# so they skip waiting for the journal flush; rubric sets (teacher-facing, rare)
+# wait for a majority.
+GRADING_WRITE_CONCERN = WriteConcern(w=1, j=False)
+RUBRIC_WRITE_CONCERN = WriteConcern(w="majority")
+# Gemini upload/cache pointers are only hints: losing one costs a re-upload.
+CACHE_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+# Attempt lookups: every field the submission record/summary reads project is in
+# this index, so those queries are answered without fetching the document. The
+# planner picks it on its own; the attempt-limit reads carry no hint, since a
+# hinted query fails outright when the index is missing (e.g. its creation was
+# blocked by duplicates) and a failed read would count as zero attempts.
+SUBMISSION_ATTEMPT_INDEX = [
+    ("student_id", pymongo.ASCENDING), ("rubric_set_id", pymongo.ASCENDING),
+    ("attempt_number", pymongo.DESCENDING), ("timestamp", pymongo.ASCENDING),
+    ("filename", pymongo.ASCENDING),
+]
+
+# Submissions untouched for this long move to the archive collection
+ARCHIVE_AFTER_DAYS = 180
+SUBMISSIONS_ARCHIVE_COLLECTION = "submissions_archive"
+
+# Gemini keeps uploaded files for 48 h; forget a shared upload an hour before that.
+GEMINI_FILE_TTL_SECONDS = 47 * 3600
+
+# Context caches of rubric PDFs are created with a 1 h TTL; forget them 5 min early.
+GEMINI_CACHE_TTL_SECONDS = 3600
+GEMINI_CACHE_REUSE_SECONDS = GEMINI_CACHE_TTL_SECONDS - 300
+
+# bcrypt cost for new password hashes (existing hashes keep the cost they were made with)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt releases the GIL while hashing, so a thread per core runs hashes in
+# parallel; async callers hand their bcrypt work to this pool instead of
+# stalling the event loop.
+_BCRYPT_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="bcrypt")
+
+# Successful logins are remembered briefly so session re-checks skip bcrypt.
+# Keys are HMACs under a per-process secret, so no password material is kept;
+# failed attempts are never cached and always pay the full bcrypt cost.
+LOGIN_CACHE_TTL = 60
+_login_cache = TTLCache(maxsize=1024, ttl=LOGIN_CACHE_TTL)
+_login_cache_lock = threading.Lock()
+_login_cache_secret = secrets.token_bytes(32)
+
+
+def _login_key(role: str, user_id: str, password_plain: str, pw_hash: bytes) -> bytes:
+    # The stored hash is part of the key, so a changed password never hits an old entry
+    return hmac.new(_login_cache_secret, f"{role}:{user_id}:{pw_hash}:{password_plain}".encode(), hashlib.sha256).digest()
+
+
+def _check_password(role: str, user_id: str, password_plain: str, pw_hash: Union[bytes, str]) -> bool:
+    """bcrypt.checkpw, skipped for a login that succeeded within LOGIN_CACHE_TTL seconds."""
+    if isinstance(pw_hash, str):
+        # Accounts created before hashes were stored as BSON binary
+        pw_hash = pw_hash.encode()
+    key = _login_key(role, user_id, password_plain, pw_hash)
+    with _login_cache_lock:
+        if _login_cache.get(key):
+            return True
+    ok = bcrypt.checkpw(password_plain.encode(), pw_hash)
+    if ok:
+        with _login_cache_lock:
+            _login_cache[key] = True
+    return ok
+
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    # Without motor the async methods run the sync ones in a worker thread.
+    AsyncIOMotorClient = None
+
+
+# Shared by the PyMongo and Motor clients. Rubrics and results are large, highly
+# compressible documents, so wire compression is negotiated (zstd, then snappy,
+# then zlib; a codec whose library is not installed is skipped by the driver),
+# and connections fail fast instead of stalling on a network hiccup.
+MONGO_CONNECTION_OPTIONS = dict(
+    serverSelectionTimeoutMS=5000,
+    connectTimeoutMS=2000,
+    socketTimeoutMS=20000,
+    compressors="zstd,snappy,zlib",
+    zlibCompressionLevel=6,
+    appname="edulens",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_mongo_client() -> MongoClient:
+    """
+    The process-wide PyMongo client. MongoClient is thread-safe and pools its
+    connections, so every MongoDBClient shares this one instead of opening
+    (and TLS-handshaking) a pool of its own.
+    """
+    return MongoClient(
+        MONGO_URI,
+        maxPoolSize=100,
+        minPoolSize=10,
+        waitQueueTimeoutMS=2000,
+        retryWrites=True,
+        **MONGO_CONNECTION_OPTIONS,
+    )
 
 
 class MongoDBClient:
@@ -17,15 +135,32 @@ class MongoDBClient:
     def __init__(self):
         """Initialize MongoDB client and collections"""
         try:
-            self.client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+            self.client = get_mongo_client()
             self.db = self.client[DATABASE_NAME]
             self.submissions_col = self.db[SUBMISSIONS_COLLECTION]
             self.rubric_sets_col = self.db[RUBRIC_SETS_COLLECTION]
+            # Old semesters' submissions, kept out of the hot collection
+            self.submissions_archive_col = self.db[SUBMISSIONS_ARCHIVE_COLLECTION]
+            self._grading_writes_col = self.submissions_col.with_options(write_concern=GRADING_WRITE_CONCERN)
+            self._rubric_writes_col = self.rubric_sets_col.with_options(write_concern=RUBRIC_WRITE_CONCERN)
             
             # User collections for registration/login
             self.students_col = self.db["students"]
             self.teachers_col = self.db["teachers"]
             
+            # Saved bluebook extractions (teacher history)
+            self.bluebook_results_col = self.db["bluebook_results"]
+            
+            # Gemini uploads shared across processes: file sha256 -> Gemini file name
+            self.gemini_files_col = self.db["gemini_file_cache"]
+            # Gemini context caches of rubric PDFs: file sha256 -> cached content name
+            self.gemini_caches_col = self.db["gemini_caches"]
+            self._gemini_files_writes_col = self.gemini_files_col.with_options(write_concern=CACHE_WRITE_CONCERN)
+            self._gemini_caches_writes_col = self.gemini_caches_col.with_options(write_concern=CACHE_WRITE_CONCERN)
+            
+            # Motor databases, one per event loop (a Motor client is bound to its loop)
+            self._async_dbs = weakref.WeakKeyDictionary()
+            
             self._ensure_indexes()
             print("✅ MongoDB client initialized successfully")
         except Exception as e:
@@ -33,28 +168,85 @@ class MongoDBClient:
             raise
     
     def _ensure_indexes(self):
-        """Ensures unique indexes are set on the collections."""
-        try:
-            # Submission indexes
-            self.submissions_col.create_index(
-                [("student_id", pymongo.ASCENDING), ("rubric_set_id", pymongo.ASCENDING)], 
-                unique=True
-            )
-            
-            # Rubric set indexes
-            self.rubric_sets_col.create_index(
-                [("rubric_set_id", pymongo.ASCENDING)], 
-                unique=True
-            )
-            
-            # User indexes
-            self.students_col.create_index([("student_id", pymongo.ASCENDING)], unique=True)
-            self.teachers_col.create_index([("teacher_id", pymongo.ASCENDING)], unique=True)
-            
+        """Ensures unique indexes are set on the collections.
+
+        One ``create_indexes`` round-trip per collection; each collection is
+        tried separately so a conflict on one does not skip the rest.
+        """
+        A, D = pymongo.ASCENDING, pymongo.DESCENDING
+        specs = [
+            (self.submissions_col, [
+                IndexModel([("student_id", A), ("rubric_set_id", A)], unique=True),
+                IndexModel(SUBMISSION_ATTEMPT_INDEX),
+                # Student dashboard: find({student_id}).sort(timestamp desc)
+                IndexModel([("student_id", A), ("timestamp", D)]),
+                # Score history: carries every field list_submission_summaries_for_student
+                # projects, so that query is answered from the index alone
+                IndexModel([("student_id", A), ("timestamp", D), ("rubric_set_id", A),
+                            ("attempt_number", A), ("result.total_score", A)]),
+                # Teacher view: find({rubric_set_id}).sort(timestamp desc), paged
+                IndexModel([("rubric_set_id", A), ("timestamp", D)]),
+            ]),
+            (self.submissions_archive_col, [
+                IndexModel([("student_id", A), ("rubric_set_id", A)]),
+                # Restoring a reopened rubric set
+                IndexModel([("rubric_set_id", A)]),
+            ]),
+            (self.rubric_sets_col, [
+                IndexModel([("rubric_set_id", A)], unique=True),
+            ]),
+            (self.students_col, [IndexModel([("student_id", A)], unique=True)]),
+            (self.teachers_col, [IndexModel([("teacher_id", A)], unique=True)]),
+            # Shared Gemini uploads: lookup by content hash, expired by Mongo's TTL monitor
+            (self.gemini_files_col, [
+                IndexModel([("sha256", A)], unique=True),
+                IndexModel([("uploaded_at", A)], expireAfterSeconds=GEMINI_FILE_TTL_SECONDS),
+            ]),
+            (self.gemini_caches_col, [
+                IndexModel([("sha256", A)], unique=True),
+                IndexModel([("created_at", A)], expireAfterSeconds=GEMINI_CACHE_REUSE_SECONDS),
+            ]),
+            # Bluebook history: find({teacher_id}).sort(extraction_date desc)
+            (self.bluebook_results_col, [
+                IndexModel([("teacher_id", A), ("extraction_date", D)]),
+            ]),
+        ]
+        ok = True
+        for col, models in specs:
+            try:
+                col.create_indexes(models)
+            except Exception as e:
+                # Index creation may fail if fields don't exist yet; ignore gracefully
+                ok = False
+                print(f"Warning: Index creation ({col.name}): {e}")
+        if ok:
             print("✅ MongoDB indexes ensured.")
-        except Exception as e:
-            # Index creation may fail if fields don't exist yet; ignore gracefully
-            print(f"Warning: Index creation: {e}")
+    
+    # ============================================
+    # ASYNC (MOTOR) HANDLES
+    # ============================================
+    
+    def _async_db(self):
+        """Motor database for the running event loop, or None if motor is not installed."""
+        if AsyncIOMotorClient is None:
+            return None
+        loop = asyncio.get_running_loop()
+        db = self._async_dbs.get(loop)
+        if db is None:
+            client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=50, io_loop=loop, **MONGO_CONNECTION_OPTIONS)
+            db = client[DATABASE_NAME]
+            self._async_dbs[loop] = db
+        return db
+    
+    @property
+    def async_submissions_col(self):
+        db = self._async_db()
+        return db[SUBMISSIONS_COLLECTION] if db is not None else None
+    
+    @property
+    def async_rubric_sets_col(self):
+        db = self._async_db()
+        return db[RUBRIC_SETS_COLLECTION] if db is not None else None
     
     # ============================================
     # RUBRIC SET OPERATIONS
@@ -71,81 +263,472 @@ class MongoDBClient:
             print(f"Error getting rubric meta: {e}")
             return None
     
+    def get_rubric_meta_light(self, rubric_set_id: str) -> Optional[Dict[str, Any]]:
+        """Deadline, attempt limit and creation time only, without the rubrics themselves."""
+        try:
+            return self.rubric_sets_col.find_one(
+                {"rubric_set_id": rubric_set_id},
+                {"_id": 0, "deadline": 1, "max_attempts": 1, "created_at": 1}
+            )
+        except Exception as e:
+            print(f"Error getting rubric meta: {e}")
+            return None
+    
+    def get_rubric_metas(self, rubric_set_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of several rubric sets in one $in query, keyed by rubric_set_id."""
+        try:
+            cursor = self.rubric_sets_col.find(
+                {"rubric_set_id": {"$in": list(rubric_set_ids)}}, {"_id": 0}
+            )
+            return {doc["rubric_set_id"]: doc for doc in cursor}
+        except Exception as e:
+            print(f"Error getting rubric metas: {e}")
+            return {}
+    
+    async def aget_rubric_metas(self, rubric_set_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Async `get_rubric_metas`."""
+        col = self.async_rubric_sets_col
+        if col is None:
+            return await asyncio.to_thread(self.get_rubric_metas, rubric_set_ids)
+        try:
+            docs = await col.find(
+                {"rubric_set_id": {"$in": list(rubric_set_ids)}}, {"_id": 0}
+            ).to_list(None)
+            return {doc["rubric_set_id"]: doc for doc in docs}
+        except Exception as e:
+            print(f"Error getting rubric metas: {e}")
+            return {}
+    
+    async def aget_rubric_meta(self, rubric_set_id: str) -> Optional[Dict[str, Any]]:
+        """Async `get_rubric_meta`."""
+        col = self.async_rubric_sets_col
+        if col is None:
+            return await asyncio.to_thread(self.get_rubric_meta, rubric_set_id)
+        try:
+            return await col.find_one({"rubric_set_id": rubric_set_id}, {"_id": 0})
+        except Exception as e:
+            print(f"Error getting rubric meta: {e}")
+            return None
+    
+    @staticmethod
+    def _rubric_set_update(parsed_rubrics: List[Dict[str, Any]], deadline: Optional[datetime],
+                           max_attempts: Optional[int], teacher_id: Optional[str] = None) -> Dict[str, Any]:
+        """Update document shared by the sync and async rubric set upserts."""
+        deadline_iso = deadline.isoformat() if deadline else None
+        max_attempts_val = max_attempts if max_attempts is not None else None
+        update = {
+            "$setOnInsert": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "parsed_rubrics": parsed_rubrics
+            },
+            "$set": {
+                "deadline": deadline_iso,
+                "max_attempts": max_attempts_val,
+                # Grading-prompt form of parsed_rubrics, serialized once here
+                # ($set so sets stored before this field get it on their next upsert)
+                "parsed_rubrics_prompt_json": rubrics_prompt_json(parsed_rubrics)
+            }
+        }
+        if teacher_id:
+            # Owner link written in the same round-trip instead of a follow-up update
+            update["$set"]["teacher_id"] = teacher_id
+        return update
+    
     def upsert_rubric_set(self, rubric_set_id: str, parsed_rubrics: List[Dict[str, Any]], 
-                         deadline: Optional[datetime], max_attempts: Optional[int]):
-        """Persists rubric, deadline, and max_attempts metadata."""
+                         deadline: Optional[datetime], max_attempts: Optional[int],
+                         teacher_id: Optional[str] = None):
+        """Persists rubric, deadline, and max_attempts metadata (and the owning teacher, if given)."""
         try:
-            deadline_iso = deadline.isoformat() if deadline else None
-            max_attempts_val = max_attempts if max_attempts is not None else None
-            
-            self.rubric_sets_col.update_one(
+            self._rubric_writes_col.update_one(
                 {"rubric_set_id": rubric_set_id},
-                {
-                    "$setOnInsert": {
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "parsed_rubrics": parsed_rubrics
-                    },
-                    "$set": {
-                        "deadline": deadline_iso,
-                        "max_attempts": max_attempts_val
-                    }
-                },
+                self._rubric_set_update(parsed_rubrics, deadline, max_attempts, teacher_id),
                 upsert=True
             )
             print(f"✅ Rubric set {rubric_set_id[:16]}... saved successfully")
         except Exception as e:
             print(f"Error upserting rubric set: {e}")
             raise
+        if self._is_open(deadline):
+            self.restore_archived_submissions(rubric_set_id)
+    
+    async def aupsert_rubric_set(self, rubric_set_id: str, parsed_rubrics: List[Dict[str, Any]],
+                                 deadline: Optional[datetime], max_attempts: Optional[int],
+                                 teacher_id: Optional[str] = None):
+        """Async `upsert_rubric_set`."""
+        col = self.async_rubric_sets_col
+        if col is None:
+            return await asyncio.to_thread(
+                self.upsert_rubric_set, rubric_set_id, parsed_rubrics, deadline, max_attempts, teacher_id
+            )
+        try:
+            await col.with_options(write_concern=RUBRIC_WRITE_CONCERN).update_one(
+                {"rubric_set_id": rubric_set_id},
+                self._rubric_set_update(parsed_rubrics, deadline, max_attempts, teacher_id),
+                upsert=True
+            )
+            print(f"✅ Rubric set {rubric_set_id[:16]}... saved successfully")
+        except Exception as e:
+            print(f"Error upserting rubric set: {e}")
+            raise
+        if self._is_open(deadline):
+            await asyncio.to_thread(self.restore_archived_submissions, rubric_set_id)
+    
+    @staticmethod
+    def _is_open(deadline: Optional[datetime]) -> bool:
+        """Whether a rubric set with this deadline still accepts submissions."""
+        if deadline is None:
+            return True
+        # Same reading as the submission check: the stored wall-clock time, as UTC
+        return deadline.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
     
     # ============================================
     # SUBMISSION OPERATIONS
     # ============================================
     
-    def get_submission_record(self, student_id: str, rubric_set_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieves the last submission record for a student."""
+    def get_submission_record(self, student_id: str, rubric_set_id: str,
+                              include_archive: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the last submission record for a student. Only the attempt
+        count is returned; that is all the attempt checks need, and the full
+        document carries the rubrics and feedback. With `include_archive`,
+        archived submissions are searched too.
+        """
         try:
+            if include_archive:
+                match = {"$match": {"student_id": student_id, "rubric_set_id": rubric_set_id}}
+                docs = list(self.submissions_col.aggregate([
+                    match,
+                    {"$unionWith": {"coll": SUBMISSIONS_ARCHIVE_COLLECTION, "pipeline": [match]}},
+                    {"$project": {"_id": 0, "attempt_number": 1}},
+                    {"$sort": {"attempt_number": -1}},
+                    {"$limit": 1},
+                ]))
+                return docs[0] if docs else None
             return self.submissions_col.find_one(
                 {"student_id": student_id, "rubric_set_id": rubric_set_id},
-                {"_id": 0}
+                {"_id": 0, "attempt_number": 1}
             )
         except Exception as e:
             print(f"Error getting submission record: {e}")
             return None
     
-    def upsert_submission(self, student_id: str, rubric_set_id: str, filename: str, 
-                         parsed_rubrics: List[Dict[str, Any]], parsed_result: Dict[str, Any], 
-                         new_attempt_number: int) -> str:
-        """Upserts the grading result and updates attempt number."""
+    def get_submission_summary(self, student_id: str, rubric_set_id: str) -> Optional[Dict[str, Any]]:
+        """Attempt number, timestamp and filename of a student's submission (an index-only read)."""
         try:
-            update_doc = {
-                "$set": {
-                    "filename": filename,
-                    "rubric_set_id": rubric_set_id,
-                    "rubrics": parsed_rubrics,
-                    "result": parsed_result,
-                    "timestamp": parsed_result.get("_timestamp", datetime.now(timezone.utc).isoformat()),
-                    "attempt_number": new_attempt_number
-                },
-                "$setOnInsert": {
-                    "student_id": student_id,
-                    "created_at": datetime.now(timezone.utc).isoformat()
-                }
-            }
-            
-            res = self.submissions_col.update_one(
+            return self.submissions_col.find_one(
                 {"student_id": student_id, "rubric_set_id": rubric_set_id},
-                update_doc,
-                upsert=True
+                {"_id": 0, "attempt_number": 1, "timestamp": 1, "filename": 1},
+                hint=SUBMISSION_ATTEMPT_INDEX
             )
+        except Exception as e:
+            print(f"Error getting submission summary: {e}")
+            return None
+    
+    async def aget_submission_record(self, student_id: str, rubric_set_id: str) -> Optional[Dict[str, Any]]:
+        """Async `get_submission_record`."""
+        col = self.async_submissions_col
+        if col is None:
+            return await asyncio.to_thread(self.get_submission_record, student_id, rubric_set_id)
+        try:
+            return await col.find_one(
+                {"student_id": student_id, "rubric_set_id": rubric_set_id},
+                {"_id": 0, "attempt_number": 1}
+            )
+        except Exception as e:
+            print(f"Error getting submission record: {e}")
+            return None
+    
+    def get_submission_records(self, student_ids: List[str], rubric_set_id: str) -> Dict[str, Dict[str, Any]]:
+        """Attempt records of several students for one rubric in one query, keyed by student_id."""
+        try:
+            cursor = self.submissions_col.find(
+                {"student_id": {"$in": list(student_ids)}, "rubric_set_id": rubric_set_id},
+                {"_id": 0, "student_id": 1, "attempt_number": 1}
+            )
+            return {doc["student_id"]: doc for doc in cursor}
+        except Exception as e:
+            print(f"Error getting submission records: {e}")
+            return {}
+    
+    async def aget_submission_records(self, student_ids: List[str], rubric_set_id: str) -> Dict[str, Dict[str, Any]]:
+        """Async `get_submission_records`."""
+        col = self.async_submissions_col
+        if col is None:
+            return await asyncio.to_thread(self.get_submission_records, student_ids, rubric_set_id)
+        try:
+            docs = await col.find(
+                {"student_id": {"$in": list(student_ids)}, "rubric_set_id": rubric_set_id},
+                {"_id": 0, "student_id": 1, "attempt_number": 1}
+            ).to_list(None)
+            return {doc["student_id"]: doc for doc in docs}
+        except Exception as e:
+            print(f"Error getting submission records: {e}")
+            return {}
+    
+    @staticmethod
+    def _submission_update(student_id: str, rubric_set_id: str, filename: str,
+                           parsed_rubrics: List[Dict[str, Any]],
+                           parsed_result: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        (filter, update pipeline) pair shared by the sync and async submission
+        upserts. The attempt number is incremented by the server, so concurrent
+        gradings of one student never lose an attempt, and the stored result's
+        `_attempt_number` is set from that same value.
+        """
+        now_iso = datetime.now(timezone.utc).isoformat()
+        pipeline = [
+            {"$set": {
+                # $literal: user text starting with "$" must not be read as a field path
+                "filename": {"$literal": filename},
+                "rubric_set_id": rubric_set_id,
+                "rubrics": {"$literal": parsed_rubrics},
+                "timestamp": parsed_result.get("_timestamp", now_iso),
+                "attempt_number": {"$add": [{"$ifNull": ["$attempt_number", 0]}, 1]},
+                "student_id": {"$literal": student_id},
+                "created_at": {"$ifNull": ["$created_at", now_iso]},
+            }},
+            {"$set": {
+                "result": {"$mergeObjects": [
+                    {"$literal": parsed_result}, {"_attempt_number": "$attempt_number"}
+                ]},
+            }},
+        ]
+        return {"student_id": student_id, "rubric_set_id": rubric_set_id}, pipeline
+    
+    @staticmethod
+    def _record_attempt(student_id: str, parsed_result: Dict[str, Any], doc: Optional[Dict[str, Any]]) -> str:
+        """Copies the stored attempt number into parsed_result; returns the operation for logging."""
+        attempt = (doc or {}).get("attempt_number", 1)
+        parsed_result["_attempt_number"] = attempt
+        operation = "inserted" if attempt == 1 else "updated"
+        print(f"✅ Submission {operation} for student {student_id}")
+        return operation
+    
+    def upsert_submission(self, student_id: str, rubric_set_id: str, filename: str, 
+                         parsed_rubrics: List[Dict[str, Any]], parsed_result: Dict[str, Any]) -> str:
+        """
+        Upserts the grading result and bumps the attempt number atomically, in
+        one round-trip. parsed_result["_attempt_number"] is set to the new count.
+        """
+        try:
+            query, pipeline = self._submission_update(
+                student_id, rubric_set_id, filename, parsed_rubrics, parsed_result
+            )
+            doc = self._grading_writes_col.find_one_and_update(
+                query, pipeline, projection={"_id": 0, "attempt_number": 1},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            return self._record_attempt(student_id, parsed_result, doc)
             
-            operation = "updated" if res.modified_count else "inserted"
-            print(f"✅ Submission {operation} for student {student_id}")
-            return operation
+        except Exception as e:
+            print(f"Error upserting submission: {e}")
+            raise
+    
+    def bulk_upsert_submissions(self, entries: List[Tuple[str, str, str, List[Dict[str, Any]], Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Upserts many grading results in one unordered bulk_write.
+        Each entry holds the `upsert_submission` arguments, in order; attempt
+        numbers are incremented server-side as in `upsert_submission`.
+        """
+        if not entries:
+            return {"inserted": 0, "updated": 0}
+        try:
+            ops = [UpdateOne(*self._submission_update(*entry), upsert=True) for entry in entries]
+            res = self._grading_writes_col.bulk_write(ops, ordered=False)
+            print(f"✅ Submissions saved: {res.upserted_count} inserted, {res.modified_count} updated")
+            return {"inserted": res.upserted_count, "updated": res.modified_count}
+        except Exception as e:
+            print(f"Error bulk upserting submissions: {e}")
+            raise
+    
+    async def abulk_upsert_submissions(self, entries: List[Tuple[str, str, str, List[Dict[str, Any]], Dict[str, Any]]]) -> Dict[str, int]:
+        """Async `bulk_upsert_submissions`."""
+        if not entries:
+            return {"inserted": 0, "updated": 0}
+        col = self.async_submissions_col
+        if col is None:
+            return await asyncio.to_thread(self.bulk_upsert_submissions, entries)
+        try:
+            ops = [UpdateOne(*self._submission_update(*entry), upsert=True) for entry in entries]
+            res = await col.with_options(write_concern=GRADING_WRITE_CONCERN).bulk_write(ops, ordered=False)
+            print(f"✅ Submissions saved: {res.upserted_count} inserted, {res.modified_count} updated")
+            return {"inserted": res.upserted_count, "updated": res.modified_count}
+        except Exception as e:
+            print(f"Error bulk upserting submissions: {e}")
+            raise
+    
+    async def aupsert_submission(self, student_id: str, rubric_set_id: str, filename: str,
+                                 parsed_rubrics: List[Dict[str, Any]], parsed_result: Dict[str, Any]) -> str:
+        """Async `upsert_submission`."""
+        col = self.async_submissions_col
+        if col is None:
+            return await asyncio.to_thread(
+                self.upsert_submission, student_id, rubric_set_id, filename,
+                parsed_rubrics, parsed_result
+            )
+        try:
+            query, pipeline = self._submission_update(
+                student_id, rubric_set_id, filename, parsed_rubrics, parsed_result
+            )
+            doc = await col.with_options(write_concern=GRADING_WRITE_CONCERN).find_one_and_update(
+                query, pipeline, projection={"_id": 0, "attempt_number": 1},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            return self._record_attempt(student_id, parsed_result, doc)
             
         except Exception as e:
             print(f"Error upserting submission: {e}")
             raise
     
+    def _closed_rubric_set_ids(self) -> List[str]:
+        """Rubric sets whose deadline has passed (sets without a deadline never close)."""
+        docs = self.rubric_sets_col.aggregate([
+            {"$match": {"deadline": {"$type": "string"}}},
+            # Wall-clock part read as UTC, as the submission check does; an
+            # unparseable deadline counts as open, so it is never archived
+            {"$match": {"$expr": {"$lt": [
+                {"$dateFromString": {
+                    "dateString": {"$substrCP": ["$deadline", 0, 19]},
+                    "timezone": "UTC", "onError": "$$NOW",
+                }},
+                "$$NOW",
+            ]}}},
+            {"$project": {"_id": 0, "rubric_set_id": 1}},
+        ])
+        return [doc["rubric_set_id"] for doc in docs]
+    
+    def archive_old_submissions(self, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """
+        Moves submissions not updated for `older_than_days` into the archive
+        collection, keeping the hot collection and its indexes small. Meant to
+        run from a periodic (e.g. nightly) job; returns the number moved.
+        
+        Only rubric sets past their deadline are archived: the attempt checks
+        read the hot collection alone, so an open set must keep its attempt
+        counts there. Reopening a set (`upsert_rubric_set` with a later or no
+        deadline) restores its archived submissions.
+        
+        The copy ($merge) and the delete are two steps, not one transaction. A
+        closed set takes no new submissions in between; if one is re-graded
+        anyway, its newer timestamp keeps it hot and the stale archived copy
+        loses to it on attempt_number (see `get_submission_record`).
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+        try:
+            closed = self._closed_rubric_set_ids()
+            if not closed:
+                return 0
+            old = {"timestamp": {"$lt": cutoff}, "rubric_set_id": {"$in": closed}}
+            self.submissions_col.aggregate([
+                {"$match": old},
+                {"$merge": {"into": SUBMISSIONS_ARCHIVE_COLLECTION, "on": "_id", "whenMatched": "replace"}},
+            ])
+            moved = self.submissions_col.delete_many(old).deleted_count
+            print(f"✅ Archived {moved} submissions older than {older_than_days} days")
+            return moved
+        except Exception as e:
+            print(f"Error archiving submissions: {e}")
+            return 0
+    
+    def restore_archived_submissions(self, rubric_set_id: str) -> int:
+        """
+        Moves a rubric set's archived submissions back to the hot collection, so
+        attempt counts carry on when the set is reopened. A student who already
+        has a hot submission for the set keeps it, with both attempt counts added.
+        """
+        match = {"rubric_set_id": rubric_set_id}
+        try:
+            if self.submissions_archive_col.find_one(match, {"_id": 1}) is None:
+                return 0
+            self.submissions_archive_col.aggregate([
+                {"$match": match},
+                {"$project": {"_id": 0}},
+                {"$merge": {
+                    "into": SUBMISSIONS_COLLECTION,
+                    "on": ["student_id", "rubric_set_id"],
+                    "whenMatched": [{"$set": {
+                        "attempt_number": {"$add": ["$attempt_number", "$$new.attempt_number"]},
+                    }}],
+                    "whenNotMatched": "insert",
+                }},
+            ])
+            restored = self.submissions_archive_col.delete_many(match).deleted_count
+            print(f"✅ Restored {restored} archived submissions for rubric set {rubric_set_id[:16]}...")
+            return restored
+        except Exception as e:
+            print(f"Error restoring archived submissions: {e}")
+            return 0
+    
+    # ============================================
+    # GEMINI FILE CACHE
+    # ============================================
+    
+    def get_gemini_file(self, sha256: str) -> Optional[str]:
+        """Gemini file name of a live upload of these bytes, if any process made one."""
+        try:
+            doc = self.gemini_files_col.find_one({"sha256": sha256}, {"_id": 0, "file_name": 1, "uploaded_at": 1})
+        except Exception as e:
+            print(f"Error reading Gemini file cache: {e}")
+            return None
+        if not doc:
+            return None
+        uploaded_at = doc["uploaded_at"].replace(tzinfo=timezone.utc)
+        # The TTL monitor only runs once a minute; don't hand out an expired name meanwhile
+        if (datetime.now(timezone.utc) - uploaded_at).total_seconds() >= GEMINI_FILE_TTL_SECONDS:
+            return None
+        return doc["file_name"]
+    
+    def put_gemini_file(self, sha256: str, file_name: str) -> None:
+        """Records an upload so other processes can reuse it."""
+        try:
+            self._gemini_files_writes_col.update_one(
+                {"sha256": sha256},
+                {"$set": {"file_name": file_name, "uploaded_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing Gemini file cache: {e}")
+    
+    @staticmethod
+    def _gemini_cache_key(sha256: str, model: str) -> str:
+        # Cached content is bound to the model it was created for
+        return f"{model}:{sha256}"
+    
+    def get_gemini_cache(self, sha256: str, model: str) -> Optional[str]:
+        """Name of a live Gemini context cache of these file bytes for `model`, if any process made one."""
+        try:
+            doc = self.gemini_caches_col.find_one(
+                {"sha256": self._gemini_cache_key(sha256, model)},
+                {"_id": 0, "cache_name": 1, "created_at": 1}
+            )
+        except Exception as e:
+            print(f"Error reading Gemini context cache: {e}")
+            return None
+        if not doc:
+            return None
+        created_at = doc["created_at"].replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - created_at).total_seconds() >= GEMINI_CACHE_REUSE_SECONDS:
+            return None
+        return doc["cache_name"]
+    
+    def put_gemini_cache(self, sha256: str, model: str, cache_name: str) -> None:
+        """Records a context cache so other runs can reuse it."""
+        try:
+            self._gemini_caches_writes_col.update_one(
+                {"sha256": self._gemini_cache_key(sha256, model)},
+                {"$set": {"cache_name": cache_name, "created_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing Gemini context cache: {e}")
+    
+    def delete_gemini_cache(self, sha256: str, model: str) -> None:
+        """Forgets a context cache Gemini no longer serves (deleted or expired early)."""
+        try:
+            self._gemini_caches_writes_col.delete_one({"sha256": self._gemini_cache_key(sha256, model)})
+        except Exception as e:
+            print(f"Error deleting Gemini context cache: {e}")
+    
     # ============================================
     # STUDENT MANAGEMENT
     # ============================================
@@ -163,7 +746,8 @@ class MongoDBClient:
                 return False
             
             # Hash password
-            pw_hash = bcrypt.hashpw(password_plain.encode(), bcrypt.gensalt()).decode()
+            # Stored as BSON binary: read back as bytes, ready for bcrypt.checkpw
+            pw_hash = Binary(bcrypt.hashpw(password_plain.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)))
             
             # Create student document
             doc = {
@@ -181,6 +765,12 @@ class MongoDBClient:
             print(f"Error creating student: {e}")
             return False
     
+    async def acreate_student(self, student_id: str, name: Optional[str], password_plain: str) -> bool:
+        """Async `create_student`; the bcrypt hash runs on the bcrypt pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            _BCRYPT_POOL, self.create_student, student_id, name, password_plain
+        )
+    
     def get_student(self, student_id: str) -> Optional[Dict[str, Any]]:
         """Get student information by ID"""
         try:
@@ -201,15 +791,18 @@ class MongoDBClient:
                 return False
             
             # Verify password
-            return bcrypt.checkpw(
-                password_plain.encode(), 
-                user.get("password_hash").encode()
-            )
+            return _check_password("student", student_id, password_plain, user.get("password_hash"))
             
         except Exception as e:
             print(f"Error verifying student password: {e}")
             return False
     
+    async def averify_student_password(self, student_id: str, password_plain: str) -> bool:
+        """Async `verify_student_password`; the bcrypt check runs on the bcrypt pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            _BCRYPT_POOL, self.verify_student_password, student_id, password_plain
+        )
+    
     # ============================================
     # TEACHER MANAGEMENT
     # ============================================
@@ -227,7 +820,8 @@ class MongoDBClient:
                 return False
             
             # Hash password
-            pw_hash = bcrypt.hashpw(password_plain.encode(), bcrypt.gensalt()).decode()
+            # Stored as BSON binary: read back as bytes, ready for bcrypt.checkpw
+            pw_hash = Binary(bcrypt.hashpw(password_plain.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)))
             
             # Create teacher document
             doc = {
@@ -245,6 +839,12 @@ class MongoDBClient:
             print(f"Error creating teacher: {e}")
             return False
     
+    async def acreate_teacher(self, teacher_id: str, name: Optional[str], password_plain: str) -> bool:
+        """Async `create_teacher`; the bcrypt hash runs on the bcrypt pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            _BCRYPT_POOL, self.create_teacher, teacher_id, name, password_plain
+        )
+    
     def get_teacher(self, teacher_id: str) -> Optional[Dict[str, Any]]:
         """Get teacher information by ID"""
         try:
@@ -265,14 +865,17 @@ class MongoDBClient:
                 return False
             
             # Verify password
-            return bcrypt.checkpw(
-                password_plain.encode(), 
-                user.get("password_hash").encode()
-            )
+            return _check_password("teacher", teacher_id, password_plain, user.get("password_hash"))
             
         except Exception as e:
             print(f"Error verifying teacher password: {e}")
             return False
+    
+    async def averify_teacher_password(self, teacher_id: str, password_plain: str) -> bool:
+        """Async `verify_teacher_password`; the bcrypt check runs on the bcrypt pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            _BCRYPT_POOL, self.verify_teacher_password, teacher_id, password_plain
+        )
 
 
 # ============================================
@@ -18,6 +18,7 @@ from app.api.frontend_api import (
 
 from app.core.config import get_ist_timezone, now_utc
 from frontend.pages.utils.session_manager import check_authentication
+from frontend.pages.utils.ui_components import load_css
 
 st.set_page_config(page_title="Student Dashboard", page_icon="👨‍🎓", layout="wide")
 
@@ -25,71 +26,7 @@ st.set_page_config(page_title="Student Dashboard", page_icon="👨‍🎓", layo
 check_authentication('student')
 
 # MSRIT Color Scheme
-st.markdown("""
-<style>
-    /* MSRIT Color Theme */
-    .stApp {
-        background-color: #f5f5f5;
-    }
-    
-    /* Primary buttons - Red */
-    .stButton > button[kind="primary"] {
-        background-color: #c41e3a !important;
-        color: white !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background-color: #a01830 !important;
-    }
-    
-    /* Regular buttons - Navy */
-    .stButton > button {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: #1f2d3d !important;
-    }
-    
-    /* Sidebar */
-    section[data-testid="stSidebar"] {
-        background-color: #2d3e50 !important;
-    }
-    
-    section[data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        color: #2d3e50 !important;
-    }
-    
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        background-color: #2d3e50;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        color: white !important;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: #c41e3a !important;
-    }
-    
-    /* Progress bar */
-    .stProgress > div > div {
-        background-color: #c41e3a !important;
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        color: #c41e3a !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+load_css("styles/student_dashboard.css")
 
 st.title("👨‍🎓 Student Dashboard")
 st.markdown(f"**Welcome, {st.session_state.user_name}!**")
@@ -284,8 +221,8 @@ with tab2:
                     st.markdown(f"**📁 File:** {submission.get('filename', 'N/A')}")
                 
                 with col2:
-                    rubrics = submission.get('rubrics', [])
-                    max_score = len(rubrics) * 10
+                    rubric_count = submission.get('rubric_count', len(submission.get('rubrics', [])))
+                    max_score = rubric_count * 10
                     st.markdown(f"**🎯 Score:** {total_score} / {max_score}")
                 
                 st.markdown("---")
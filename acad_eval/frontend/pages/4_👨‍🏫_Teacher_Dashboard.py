@@ -7,6 +7,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 sys.path.insert(0, project_root)
 
 from frontend.pages.utils.session_manager import check_authentication
+from frontend.pages.utils.ui_components import load_css
 
 st.set_page_config(page_title="Teacher Dashboard", page_icon="👨‍🏫", layout="wide")
 
@@ -14,53 +15,7 @@ st.set_page_config(page_title="Teacher Dashboard", page_icon="👨‍🏫", layo
 check_authentication('teacher')
 
 # MSRIT Color Scheme
-st.markdown("""
-<style>
-    /* MSRIT Color Theme */
-    .stApp {
-        background-color: #f5f5f5;
-    }
-    
-    /* Primary buttons - Red */
-    .stButton > button[kind="primary"] {
-        background-color: #c41e3a !important;
-        color: white !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background-color: #a01830 !important;
-    }
-    
-    /* Regular buttons - Navy */
-    .stButton > button {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: #1f2d3d !important;
-    }
-    
-    /* Sidebar */
-    section[data-testid="stSidebar"] {
-        background-color: #2d3e50 !important;
-    }
-    
-    section[data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        color: #2d3e50 !important;
-    }
-    
-    /* Card styling */
-    .element-container div[data-testid="stMarkdownContainer"] div[style*="background"] {
-        border: 2px solid #c41e3a !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+load_css("styles/teacher_dashboard.css")
 
 st.title("👨‍🏫 Teacher Dashboard")
 st.markdown(f"**Welcome, {st.session_state.user_name}!**")
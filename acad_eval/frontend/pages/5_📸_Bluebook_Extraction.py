@@ -1,7 +1,6 @@
 import streamlit as st
 import sys
 import os
-import json
 import pandas as pd
 from datetime import datetime
 
@@ -15,7 +14,9 @@ from app.api.frontend_api import (
     get_bluebook_history
 )
 
+from ai_models.llm_evaluation._common import json_pretty
 from frontend.pages.utils.session_manager import check_authentication
+from frontend.pages.utils.ui_components import load_css
 
 st.set_page_config(page_title="Bluebook Extraction", page_icon="📸", layout="wide")
 
@@ -23,92 +24,7 @@ st.set_page_config(page_title="Bluebook Extraction", page_icon="📸", layout="w
 check_authentication('teacher')
 
 # MSRIT Color Scheme
-st.markdown("""
-<style>
-    /* MSRIT Color Theme */
-    .stApp {
-        background-color: #f5f5f5;
-    }
-    
-    /* Primary buttons - Red */
-    .stButton > button[kind="primary"] {
-        background-color: #c41e3a !important;
-        color: white !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background-color: #a01830 !important;
-    }
-    
-    /* Secondary buttons - Navy */
-    .stButton > button[kind="secondary"] {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    .stButton > button[kind="secondary"]:hover {
-        background-color: #1f2d3d !important;
-    }
-    
-    /* Regular buttons - Navy */
-    .stButton > button {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: #1f2d3d !important;
-    }
-    
-    /* Sidebar */
-    section[data-testid="stSidebar"] {
-        background-color: #2d3e50 !important;
-    }
-    
-    section[data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        color: #2d3e50 !important;
-    }
-    
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        background-color: #2d3e50;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        color: white !important;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: #c41e3a !important;
-    }
-    
-    /* Radio buttons */
-    .stRadio > label {
-        color: #2d3e50 !important;
-        font-weight: 600 !important;
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        color: #c41e3a !important;
-    }
-    
-    /* Download buttons */
-    .stDownloadButton > button {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    .stDownloadButton > button:hover {
-        background-color: #c41e3a !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+load_css("styles/bluebook_extraction.css")
 
 st.title("📸 Bluebook Marks Extraction")
 st.markdown(f"**Welcome, {st.session_state.user_name}!**")
@@ -258,7 +174,7 @@ def _process_and_display_extraction(temp_paths, source_name):
                         use_container_width=True
                     )
                     
-                    json_str = json.dumps(extracted_data, indent=2)
+                    json_str = json_pretty(extracted_data)
                     st.download_button(
                         label="📥 Download as JSON",
                         data=json_str,
@@ -17,6 +17,7 @@ from app.api.frontend_api import (
 
 from app.core.config import get_ist_timezone
 from frontend.pages.utils.session_manager import check_authentication
+from frontend.pages.utils.ui_components import load_css
 
 st.set_page_config(page_title="Report Evaluation", page_icon="📝", layout="wide")
 
@@ -24,84 +25,7 @@ st.set_page_config(page_title="Report Evaluation", page_icon="📝", layout="wid
 check_authentication('teacher')
 
 # MSRIT Color Scheme
-st.markdown("""
-<style>
-    /* MSRIT Color Theme */
-    .stApp {
-        background-color: #f5f5f5;
-    }
-    
-    /* Primary buttons - Red */
-    .stButton > button[kind="primary"] {
-        background-color: #c41e3a !important;
-        color: white !important;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background-color: #a01830 !important;
-    }
-    
-    /* Regular buttons - Navy */
-    .stButton > button {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: #1f2d3d !important;
-    }
-    
-    /* Sidebar */
-    section[data-testid="stSidebar"] {
-        background-color: #2d3e50 !important;
-    }
-    
-    section[data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        color: #2d3e50 !important;
-    }
-    
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        background-color: #2d3e50;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        color: white !important;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: #c41e3a !important;
-    }
-    
-    /* Form elements */
-    .stTextInput > label, .stDateInput > label, .stTimeInput > label, 
-    .stNumberInput > label, .stFileUploader > label {
-        color: #2d3e50 !important;
-        font-weight: 600 !important;
-    }
-    
-    /* Dataframes */
-    .stDataFrame {
-        border: 2px solid #2d3e50 !important;
-    }
-    
-    /* Expander */
-    .streamlit-expanderHeader {
-        background-color: #2d3e50 !important;
-        color: white !important;
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        color: #c41e3a !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+load_css("styles/report_evaluation.css")
 
 st.title("📝 Report Evaluation")
 st.markdown(f"**Welcome, {st.session_state.user_name}!**")
@@ -129,7 +53,7 @@ with tab1:
     st.header("📝 Create New Rubric Set")
     st.info("ℹ️ Upload a PDF containing your grading rubric. AI will extract the criteria automatically.")
     
-    with st.form("rubric_upload_form"):
+    with st.form("rubric_upload_form", clear_on_submit=True):
         uploaded_rubric = st.file_uploader(
             "Upload Rubric PDF",
             type=['pdf'],
@@ -155,14 +79,10 @@ with tab1:
         submitted = st.form_submit_button("🚀 Create Rubric Set", use_container_width=True, type="primary")
         
         if submitted:
+            st.session_state.pop('rubric_created', None)
             if not uploaded_rubric:
                 st.error("⚠️ Please upload a rubric PDF file")
             else:
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                    tmp_file.write(uploaded_rubric.getbuffer())
-                    temp_path = tmp_file.name
-                
                 deadline_iso = None
                 deadline_display_str = "None (Unlimited)"
                 
@@ -181,7 +101,7 @@ with tab1:
                 with st.spinner("🧠 AI is extracting rubric criteria... Please wait..."):
                     try:
                         result = extract_and_save_rubric_from_pdf(
-                            temp_path,
+                            uploaded_rubric.getvalue(),
                             st.session_state.user_id,
                             deadline_iso,
                             final_max_attempts
@@ -193,29 +113,32 @@ with tab1:
                             st.success("✅ Rubric setup complete.")
                             st.balloons()
                             
-                            rubric_set_id = result['rubric_set_id']
-                            parsed_rubrics = result['parsed_rubrics']
-                            
-                            # --- LOGIC PARITY: Display exact same confirmation info as main.py ---
-                            st.markdown("### 📝 Rubric Setup Summary")
-                            st.info(f"""
-**Rubric Set ID:** `{rubric_set_id}`  
-**Deadline (IST):** {deadline_display_str}  
-**Max Attempts:** {attempts_str}  
-**Parsed Criteria:** {len(parsed_rubrics)} criteria
-""")
-                            
-                            st.warning("📌 Share this Rubric Set ID with students so they can submit against it.")
-                            
-                            st.markdown("### 🧠 Extracted Logic (Raw JSON):")
-                            st.json(parsed_rubrics, expanded=True)
-                        
-                        os.unlink(temp_path)
+                            # Kept in session state so the summary survives later reruns
+                            st.session_state.rubric_created = {
+                                'rubric_set_id': result['rubric_set_id'],
+                                'deadline': deadline_display_str,
+                                'attempts': attempts_str,
+                                'parsed_rubrics': result['parsed_rubrics'],
+                            }
                         
                     except Exception as e:
                         st.error(f"❌ Failed to create rubric: {str(e)}")
-                        if os.path.exists(temp_path):
-                            os.unlink(temp_path)
+    
+    created = st.session_state.get('rubric_created')
+    if created:
+        # --- LOGIC PARITY: Display exact same confirmation info as main.py ---
+        st.markdown("### 📝 Rubric Setup Summary")
+        st.info(f"""
+**Rubric Set ID:** `{created['rubric_set_id']}`  
+**Deadline (IST):** {created['deadline']}  
+**Max Attempts:** {created['attempts']}  
+**Parsed Criteria:** {len(created['parsed_rubrics'])} criteria
+""")
+        
+        st.warning("📌 Share this Rubric Set ID with students so they can submit against it.")
+        
+        st.markdown("### 🧠 Extracted Logic (Raw JSON):")
+        st.json(created['parsed_rubrics'], expanded=True)
 
 # TAB 2: View Rubrics & Submissions
 with tab2:
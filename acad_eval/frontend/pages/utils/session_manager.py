@@ -1,7 +1,10 @@
 import streamlit as st
 
 def init_session_state():
-    """Initialize session state variables"""
+    """Initialize session state variables (once per session; logout's clear() resets it)"""
+    if st.session_state.get('_session_inited'):
+        return
+    st.session_state['_session_inited'] = True
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
     if 'user_type' not in st.session_state:
@@ -16,7 +19,7 @@ def check_authentication(required_role=None):
     if not st.session_state.get('logged_in', False):
         st.error("🔒 Please login to access this page")
         if st.button("Go to Login"):
-            st.switch_page("pages/1_🔐_Login.py")
+            st.switch_page("EduLens.py")
         st.stop()
     
     if required_role and st.session_state.get('user_type') != required_role:
@@ -1,5 +1,20 @@
+import os
 import streamlit as st
 
+# frontend/ — relative stylesheet paths resolve from here, not the cwd
+FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+@st.cache_data(show_spinner=False)
+def _read_css(path):
+    """Read a stylesheet once per server process (keyed on its absolute path)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def load_css(css_file):
+    """Inject a stylesheet from frontend/styles without re-reading it on every rerun"""
+    path = css_file if os.path.isabs(css_file) else os.path.join(FRONTEND_DIR, css_file)
+    st.markdown(f"<style>{_read_css(path)}</style>", unsafe_allow_html=True)
+
 def display_score_card(score, max_score):
     """Display a score card with progress bar"""
     percentage = (score / max_score) * 100 if max_score > 0 else 0